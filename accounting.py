@@ -0,0 +1,160 @@
+from datetime import date
+import numpy as np
+from constants import CLUSTERS
+from utils import (
+    PercentNotified,
+    notification_percentages,
+    stored_notification,
+    get_usage_snapshot,
+)
+
+
+# find_next_notification for arrays: the percentage of the highest level the
+# usage exceeds
+notification_thresholds = np.array(notification_percentages)
+
+
+def find_next_notifications(percent_usage):
+    index = np.searchsorted(notification_thresholds, percent_usage, side="left") - 1
+    return notification_thresholds[np.maximum(index, 0)]
+
+
+class SusLimits:
+    # The SU accounting of many accounts at once, one entry per context.
+    # Investments are (accounts x investments) arrays in the order of
+    # ctx.investments, padded with zeros
+    def __init__(self, contexts):
+        self.contexts = contexts
+        n = len(contexts)
+        width = max([len(ctx.investments) for ctx in contexts], default=0)
+
+        snapshot = get_usage_snapshot([ctx.account for ctx in contexts])
+        raw_usage = np.array(
+            [[snapshot.get(ctx.account, c) for c in CLUSTERS] for ctx in contexts],
+            dtype=float,
+        ).reshape(n, len(CLUSTERS))
+        self.used = np.floor(raw_usage / (60.0 * 60.0)).sum(axis=1)
+        self.proposal_total = (
+            np.array(
+                [[ctx.proposal[c] for c in CLUSTERS] for ctx in contexts], dtype=float
+            )
+            .reshape(n, len(CLUSTERS))
+            .sum(axis=1)
+        )
+        self.percent_notified = np.array(
+            [
+                stored_notification(ctx.proposal["percent_notified"]).value
+                for ctx in contexts
+            ],
+            dtype=int,
+        )
+
+        self.valid = np.zeros((n, width), dtype=bool)
+        self.remaining = np.zeros((n, width))
+        self.available = np.zeros((n, width))
+        rows = [
+            (i, j, r)
+            for i, ctx in enumerate(contexts)
+            for j, r in enumerate(ctx.investments)
+        ]
+        if rows:
+            i, j = np.array([(i, j) for i, j, _ in rows]).T
+            self.valid[i, j] = True
+            self.remaining[i, j] = [
+                r["service_units"] - r["withdrawn_sus"] for _, _, r in rows
+            ]
+            self.available[i, j] = [
+                r["current_sus"] + r["rollover_sus"] for _, _, r in rows
+            ]
+
+        archives = [
+            (i, r) for i, ctx in enumerate(contexts) for r in ctx.investment_archives
+        ]
+        self.archive_total = np.bincount(
+            np.array([i for i, _ in archives], dtype=int),
+            weights=[r["current_sus"] + r["rollover_sus"] for _, r in archives],
+            minlength=n,
+        )
+
+    def compute(self):
+        # An investment is exhausted when every SU was withdrawn and the usage
+        # covers the proposal, the investments before it that aren't
+        # exhausted and itself (or it has nothing left). The columns are
+        # walked in order, every account at once
+        n, width = self.valid.shape
+        self.exhausted = np.zeros((n, width), dtype=bool)
+        kept = np.zeros(n)
+        for j in range(width):
+            available = self.available[:, j]
+            exhausted = (
+                self.valid[:, j]
+                & (self.remaining[:, j] == 0)
+                & (
+                    (self.used >= self.proposal_total + kept + available)
+                    | (available == 0)
+                )
+            )
+            self.exhausted[:, j] = exhausted
+            kept += np.where(self.valid[:, j] & ~exhausted, available, 0)
+
+        # Exhausted investments are archived, so they still count
+        total = self.proposal_total + self.available.sum(axis=1) + self.archive_total
+        # Accounts without SUs have no percentage, they are left alone
+        self.no_sus = total == 0
+        self.percent_usage = np.zeros(n)
+        np.divide(100.0 * self.used, total, out=self.percent_usage, where=~self.no_sus)
+        self.updated = find_next_notifications(self.percent_usage)
+
+        hundred = PercentNotified.Hundred.value
+        self.skipped = self.percent_notified == hundred
+        self.changed = (
+            ~self.skipped & ~self.no_sus & (self.updated != self.percent_notified)
+        )
+        self.locked = self.changed & (self.updated == hundred)
+        return self
+
+    def plan(self, plan):
+        # Add the archived investments and the changed proposals to `plan`,
+        # updating the contexts to match. Returns the changed contexts
+        today = date.today()
+        archives = []
+        for i, j in zip(*np.nonzero(self.exhausted)):
+            ctx = self.contexts[i]
+            row = ctx.investments[j]
+            archives.append(
+                {
+                    "service_units": row["service_units"],
+                    "current_sus": row["current_sus"],
+                    "rollover_sus": row["rollover_sus"],
+                    "start_date": row["start_date"],
+                    "end_date": row["end_date"],
+                    "exhaustion_date": today,
+                    "account": ctx.account,
+                    "proposal_id": ctx.proposal["id"],
+                    "investor_id": row["id"],
+                }
+            )
+            ctx.investment_archives.append(archives[-1])
+
+        for i in np.flatnonzero(self.exhausted.any(axis=1)):
+            ctx = self.contexts[i]
+            ctx.investments[:] = [
+                r for j, r in enumerate(ctx.investments) if not self.exhausted[i, j]
+            ]
+
+        changed = [self.contexts[i] for i in np.flatnonzero(self.changed)]
+        for ctx, value in zip(changed, self.updated[self.changed]):
+            ctx.proposal["percent_notified"] = int(value)
+
+        plan.investor_archives.extend(archives)
+        plan.investor_deletes.extend([a["investor_id"] for a in archives])
+        plan.proposal_updates.extend(
+            [
+                {
+                    "id": ctx.proposal["id"],
+                    "percent_notified": ctx.proposal["percent_notified"],
+                }
+                for ctx in changed
+            ]
+        )
+        return changed
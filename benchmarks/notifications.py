@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+""" notifications.py -- Measure how fast usage percentages are classified into notification thresholds
+Usage:
+    notifications.py [-n <values>] [-r <repeat>] [-s <seed>]
+    notifications.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+    -n --values <values>    How many usage percentages to classify [default: 100000]
+    -r --repeat <repeat>    How many times to classify them [default: 5]
+    -s --seed <seed>        The seed for the random usage percentages [default: 0]
+
+Run it from the directory you run crc_bank.py from, e.g.
+    python benchmarks/notifications.py -n 100000
+"""
+
+from docopt import docopt
+from pathlib import Path
+from random import Random
+from statistics import median
+from time import perf_counter
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import find_next_notification, notification_percentages
+
+
+def timed(f, repeat):
+    # Returns (result, median seconds)
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = f()
+        times.append(perf_counter() - start)
+    return result, median(times)
+
+
+args = docopt(__doc__)
+count = int(args["--values"])
+repeat = int(args["--repeat"])
+
+# Mostly spread over 0-120% with every threshold hit exactly
+random = Random(int(args["--seed"]))
+usages = [random.uniform(0.0, 120.0) for _ in range(count)]
+usages[: len(notification_percentages)] = notification_percentages
+
+print(f"thresholds: {', '.join([f'{p:g}%' for p in notification_percentages[1:]])}")
+print(f"classifying {count} usage percentages (median of {repeat})")
+
+levels, seconds = timed(lambda: [find_next_notification(u) for u in usages], repeat)
+print(f"  find_next_notification:  {seconds * 1000:8.1f} ms")
+
+try:
+    import numpy as np
+    from accounting import find_next_notifications
+except ImportError:
+    print("  find_next_notifications: numpy is not installed")
+else:
+    array = np.array(usages)
+    values, seconds = timed(lambda: find_next_notifications(array), repeat)
+    print(f"  find_next_notifications: {seconds * 1000:8.1f} ms")
+    if values.tolist() != [level.value for level in levels]:
+        sys.exit("find_next_notification and find_next_notifications disagree")
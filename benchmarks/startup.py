@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+""" startup.py -- Measure the imports of a crc_bank.py command with `python -X importtime`
+Usage:
+    startup.py [-n <runs>] [-t <top>] <args>...
+    startup.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+    -n --runs <runs>        How many times to run the command [default: 5]
+    -t --top <top>          How many of the slowest imports to print [default: 10]
+
+Positional Arguments:
+    <args>                  The crc_bank.py command, e.g. `get_sus sam`
+
+Run it from the directory you run crc_bank.py from, e.g.
+    python benchmarks/startup.py -n 10 get_sus sam
+"""
+
+from docopt import docopt
+from pathlib import Path
+from statistics import median
+from subprocess import run, PIPE
+import sys
+
+
+crc_bank = Path(__file__).resolve().parent.parent / "crc_bank.py"
+
+
+def import_times(cmd_args):
+    # Returns {module: cumulative microseconds} for the top level imports
+    proc = run(
+        [sys.executable, "-X", "importtime", str(crc_bank)] + cmd_args,
+        stdout=PIPE,
+        stderr=PIPE,
+    )
+    result = {}
+    for line in proc.stderr.decode("utf-8").split("\n"):
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented, their time is part of the parent
+        if not name.startswith("  "):
+            result[name.strip()] = int(cumulative)
+    return result
+
+
+args = docopt(__doc__)
+runs = [import_times(args["<args>"]) for _ in range(int(args["--runs"]))]
+
+totals = [sum(run.values()) for run in runs]
+print(f"crc_bank.py {' '.join(args['<args>'])}")
+print(f"total import time (median of {len(runs)}): {median(totals) / 1000:.1f} ms")
+print()
+
+modules = {name: median([run.get(name, 0) for run in runs]) for name in runs[0]}
+slowest = sorted(modules.items(), key=lambda x: x[1], reverse=True)
+for name, cumulative in slowest[: int(args["--top"])]:
+    print(f"{cumulative / 1000:8.1f} ms  {name}")
@@ -5,15 +5,22 @@ email='noreply@pitt.edu'
 crc_bank=$home_dir/crc_bank.py
 cron_logs=$home_dir/logs/cron.log
 
-# generate a list of all of the accounts
-accounts=($(sacctmgr list accounts -n -P format=account))
+# record the usage of every association since the last run
+errors=$($crc_bank sample_usage 2>&1 >> $cron_logs)
+if [ $? -ne 0 ]; then
+    mail -s "crc_bank.py error: sample_usage failed" $email <<< "$errors"
+fi
 
-for acc in ${accounts[@]}; do
-    $crc_bank info $acc &> /dev/null
-    if [ $? -ne 0 ]; then
-        mail -s "crc_bank.py error: no account for $acc" $email <<< "Unable to find an account for $acc"
-    else
-        $crc_bank check_sus_limit $acc >> $cron_logs 2>&1
-        $crc_bank check_proposal_end_date $acc >> $cron_logs 2>&1
-    fi
-done
+# check the SUs limit and proposal end date for every Slurm account in one
+# pass, accounts without a proposal are reported together on stderr
+errors=$($crc_bank check_all 2>&1 >> $cron_logs)
+if [ $? -ne 0 ]; then
+    mail -s "crc_bank.py error: check_all failed" $email <<< "$errors"
+fi
+
+# deliver the emails queued by check_all over a single SMTP session, failed
+# emails stay queued and are retried on the next run
+errors=$($crc_bank send_notifications 2>&1 >> $cron_logs)
+if [ $? -ne 0 ]; then
+    mail -s "crc_bank.py error: send_notifications failed" $email <<< "$errors"
+fi
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+from constants import CLUSTERS
+from utils import (
+    Left,
+    Right,
+    stored_notification,
+    get_raw_usage_in_hours,
+    get_available_investor_sus,
+)
+from accounting import SusLimits
+from notifications import (
+    sus_limit_email,
+    three_month_proposal_expiry_email,
+    proposal_expires_email,
+)
+
+
+def plan_sus_limits(contexts, plan):
+    # Archive the exhausted investments, update percent_notified, notify and
+    # lock every account at once, see accounting.SusLimits. Returns a Right or
+    # Left for each context
+    limits = SusLimits(contexts).compute()
+    for ctx in limits.plan(plan):
+        plan.notifications.append(sus_limit_email(ctx))
+        plan.log.append(
+            f"Updated proposal percent_notified to {stored_notification(ctx.proposal['percent_notified'])} for {ctx.account}"
+        )
+
+    results = []
+    for ctx, skipped, no_sus, locked in zip(
+        contexts, limits.skipped, limits.no_sus, limits.locked
+    ):
+        if skipped:
+            plan.skipped.append(ctx.account)
+            results.append(
+                Left(
+                    f"Skipping account {ctx.account} because it should have already been notified and locked"
+                )
+            )
+            continue
+
+        if no_sus:
+            plan.skipped.append(ctx.account)
+            results.append(
+                Left(f"Skipping account {ctx.account} because it has no SUs")
+            )
+            continue
+
+        if locked:
+            plan.lock.append(ctx.account)
+            plan.log.append(
+                f"The account for {ctx.account} was locked due to SUs limit"
+            )
+        results.append(Right(ctx.account))
+    return results
+
+
+def plan_proposal_end_dates(contexts, plan):
+    today = date.today()
+    for ctx in contexts:
+        account = ctx.account
+        proposal_row = ctx.proposal
+        three_months_before_end_date = proposal_row["end_date"] - timedelta(days=90)
+
+        if today == three_months_before_end_date:
+            plan.notifications.append(three_month_proposal_expiry_email(ctx))
+        elif today == proposal_row["end_date"]:
+            plan.notifications.append(proposal_expires_email(ctx))
+            plan.lock.append(account)
+            plan.log.append(
+                f"The account for {account} was locked because it reached the end date {proposal_row['end_date']}"
+            )
+
+
+def find_proposal_violations(ctx):
+    account = ctx.account
+    proposal_row = ctx.proposal
+    investments = sum(get_available_investor_sus(ctx))
+
+    violations = []
+    subtract_previous_investment = 0
+    for cluster in CLUSTERS:
+        avail_sus = proposal_row[cluster]
+        avail_investments = max(investments - subtract_previous_investment, 0)
+        used_sus = get_raw_usage_in_hours(account, cluster)
+        if used_sus > (avail_sus + avail_investments):
+            violations.append(
+                f"Account {account}, Cluster {cluster}, Used SUs {used_sus}, Avail SUs {avail_sus}, Investment SUs {avail_investments}"
+            )
+        # Usage over the proposal limit is paid for by the investments
+        if used_sus > avail_sus:
+            subtract_previous_investment += used_sus - avail_sus
+    return violations
+
+
+def find_all_proposal_violations(contexts):
+    # Results keep the order of `contexts`. With the usage already read, this
+    # is arithmetic on rows in memory, fast enough without workers
+    return [
+        violation for ctx in contexts for violation in find_proposal_violations(ctx)
+    ]
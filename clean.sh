@@ -1,2 +1,2 @@
 #!/usr/bin/env bash
-rm test.db logs/crc_bank.log proposal.json investor.json proposal_archive.json investor_archive.json
+rm test.db test.db-wal test.db-shm usage_cache.db* logs/crc_bank.log proposal.json investor.json proposal_archive.json investor_archive.json
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import dataset
+from pathlib import Path
 
 # The name you would like to display for the super cluster
 super_cluster = "H2P"
@@ -7,30 +7,106 @@ super_cluster = "H2P"
 # This should contain a list of clusters you want to track usage on
 CLUSTERS = ["smp", "mpi", "gpu", "htc"]
 
+# How many Slurm commands (sshare, sacctmgr) can run at the same time and how
+# many seconds to wait for each one before giving up
+slurm_workers = len(CLUSTERS)
+slurm_timeout = 60
+
+# Commands that apply to many accounts (e.g. locking) pass at most this many
+# accounts to one sacctmgr call
+sacctmgr_accounts_per_call = 100
+
 # When running the tests, uncomment the test.db line
-db = dataset.connect("sqlite:////ihome/crc/bank/crc_bank.db")
-# db = dataset.connect("sqlite:///test.db")
+db_path = "/ihome/crc/bank/crc_bank.db"
+# db_path = "test.db"
+
+# How many seconds to wait for another process to release a lock on the
+# database before failing with "database is locked"
+db_busy_timeout = 30
+
+# PRAGMAs applied to every connection. The database keeps the rollback
+# journal: with write-ahead logging, read-only commands (e.g. `usage`) fail
+# for users without write access to the directory of the database. Readers
+# and the writer wait up to `db_busy_timeout` for each other instead.
+# FULL is the only safe `synchronous` with the rollback journal
+db_pragmas = {
+    "synchronous": "FULL",
+    # Negative values are in KiB
+    "cache_size": -16000,
+}
 
 # None of these need to change
-proposal_table = db["proposal"]
-investor_table = db["investor"]
-investor_archive_table = db["investor_archive"]
-proposal_archive_table = db["proposal_archive"]
+tables = {
+    "proposal_table": "proposal",
+    "investor_table": "investor",
+    "investor_archive_table": "investor_archive",
+    "proposal_archive_table": "proposal_archive",
+    "notification_table": "notification_queue",
+    "usage_history_table": "usage_history",
+}
 date_format = "%m/%d/%y"
 
+# Proposals send an email the first time usage exceeds each of these whole
+# percentages, in increasing order. The last one must be 100, it locks the
+# account. `percent_notified` stores the last percentage exceeded, so
+# thresholds can be added or removed without updating the proposals
+notification_thresholds = [25, 50, 75, 90, 100]
+
+# `dump` reads `dump_page_size` rows at a time, `import_proposal` and
+# `import_investor` insert `import_chunk_size` rows at a time
+dump_page_size = 1000
+import_chunk_size = 1000
+
+
+# Usage read from sshare is cached on disk next to the database for
+# `usage_cache_ttl` seconds, keyed by (account, cluster). Least recently used
+# entries are dropped once there are more than `usage_cache_max_entries`
+usage_cache_path = str(Path(db_path).parent / "usage_cache.db")
+usage_cache_ttl = 300
+usage_cache_max_entries = 10000
+
+# The projected exhaustion date follows the trend of the usage sampled by
+# `crc_bank.py sample_usage` over the last `forecast_window_days` days
+forecast_window_days = 30
+
+# `crc_bank.py serve` listens on this Unix socket, the mode controls who can
+# connect. The usage of every account is re-read from sshare in the
+# background every `server_usage_ttl` seconds. Clients idle for
+# `server_client_timeout` seconds are disconnected
+server_socket = "/ihome/crc/bank/crc_bank.sock"
+server_socket_mode = 0o666
+server_usage_ttl = 300
+server_client_timeout = 30
+
 # What email should we use to send bot emails to PIs
 send_email_from = "noreply@pitt.edu"
 
+# Emails are queued in the database and delivered by
+# `crc_bank.py send_notifications` over one session with this SMTP server,
+# `notification_batch_size` at a time. A failed email is retried on the next
+# run until it failed `notification_max_attempts` times
+# When running the tests, uncomment the 8025 line, tests/notifications.bats
+# starts a local SMTP server on it
+smtp_host = "localhost"
+smtp_port = 25
+# smtp_port = 8025
+notification_batch_size = 100
+notification_max_attempts = 5
+
 # The email suffix for your organization
 # We assume the Description field of sacctmgr for the account contains the prefix
 email_suffix = "@pitt.edu"
 
-# An email to send when you have exceeded a proposal threshold (25%, 50%, 75%, 90%)
-# The email better contain exactly four {}! Respectively filled with:
-# 1. percent usage
-# 2. proposal start date
-# 3. account usage
-# 4. investment information
+# The emails are HTML with named placeholders, which can have a format like
+# `{percent:.0f}`. The plain text version is generated from the HTML. Each
+# email can use the placeholders listed above it
+
+# An email to send when you have exceeded a proposal threshold below 100%,
+# see notification_thresholds
+# {percent}: percent usage
+# {start_date}: proposal start date
+# {usage}: account usage
+# {investments}: investment information
 notify_sus_limit_email_text = """\
 <html>
 <head></head>
@@ -38,16 +114,16 @@ notify_sus_limit_email_text = """\
 <p>
 To Whom It May Concern,<br><br>
 This email has been generated automatically because your account on H2P has
-exceeded {}% usage. The one year allocation started on {}. You can request a
+exceeded {percent}% usage. The one year allocation started on {start_date}. You can request a
 supplemental allocation at
 https://crc.pitt.edu/Pitt-CRC-Allocation-Proposal-Guidelines.<br><br>
 Your usage is printed below:<br>
 <pre>
-{}
+{usage}
 </pre>
 Investment status (if applicable):<br>
 <pre>
-{}
+{investments}
 </pre>
 Thanks,<br><br>
 The CRC Proposal Bot
@@ -57,10 +133,9 @@ The CRC Proposal Bot
 """
 
 # An email to send when you are 90 days from the end of your proposal
-# The email should contain three {}! Respectively filled with:
-# 1. account
-# 2. proposal end date
-# 3. proposal start date
+# {account}: account
+# {end_date}: proposal end date
+# {start_date}: proposal start date
 three_month_proposal_expiry_notification_email = """\
 <html>
 <head></head>
@@ -68,10 +143,10 @@ three_month_proposal_expiry_notification_email = """\
 <p>
 To Whom It May Concern,<br><br>
 This email has been generated automatically because your proposal for account
-{} on H2P will expire in 90 days on {}. The one year allocation started on {}.
+{account} on H2P will expire in 90 days on {end_date}. The one year allocation started on {start_date}.
 If you would like to submit another proposal or request a supplemental
 allocation please visit
-https://crc.pitt.edu/Pitt-CRC-Allocation-Proposal-Guidelines.<br><br
+https://crc.pitt.edu/Pitt-CRC-Allocation-Proposal-Guidelines.<br><br>
 Thanks,<br><br>
 The CRC Proposal Bot
 </p>
@@ -80,9 +155,9 @@ The CRC Proposal Bot
 """
 
 # An email to send when the proposal has expired
-# The email should contain two {}! Respectively filled with:
-# 1. account
-# 2. proposal start date
+# {account}: account
+# {end_date}: proposal end date
+# {start_date}: proposal start date
 proposal_expires_notification_email = """\
 <html>
 <head></head>
@@ -90,7 +165,7 @@ proposal_expires_notification_email = """\
 <p>
 To Whom It May Concern,<br><br>
 This email has been generated automatically because your proposal for account
-{} on H2P has expired. The one year allocation started on {}.  If you would
+{account} on H2P has expired. The one year allocation started on {start_date}.  If you would
 like to submit another proposal please visit
 https://crc.pitt.edu/Pitt-CRC-Allocation-Proposal-Guidelines.<br><br>
 Thanks,<br><br>
@@ -99,3 +174,53 @@ The CRC Proposal Bot
 </body>
 </html>
 """
+
+
+def connect(read_only=False):
+    # dataset and SQLAlchemy are slow to import, only load them to connect
+    import dataset
+    from sqlalchemy import event
+
+    # SQLite can't open a missing database read-only, `query_only` still
+    # rejects writes in that case
+    if read_only and Path(db_path).exists():
+        url = f"sqlite:///file:{db_path}?mode=ro&uri=true"
+    else:
+        url = f"sqlite:///{db_path}"
+    database = dataset.connect(
+        url, engine_kwargs={"connect_args": {"timeout": db_busy_timeout}}
+    )
+
+    @event.listens_for(database.engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            # Switch back a database a previous version left in WAL mode
+            cursor.execute("PRAGMA journal_mode = DELETE")
+        for pragma, value in db_pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+    return database
+
+
+_db = None
+
+
+def open_db(read_only=False):
+    # The first call decides whether this process reads and writes, or only reads
+    global _db
+    if _db is None:
+        _db = connect(read_only)
+    return _db
+
+
+def __getattr__(name):
+    # `db` and the tables connect on first use, see open_db
+    if name == "db":
+        return open_db()
+    if name in tables:
+        return open_db()[tables[name]]
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -9,16 +9,25 @@ Usage:
     crc_bank.py date_investment <account> <date> <id>
     crc_bank.py investor <account> <sus>
     crc_bank.py withdraw <account> <sus>
-    crc_bank.py renewal <account> [-s <sus>] [-m <sus>] [-g <sus>] [-c <sus>]
+    crc_bank.py renewal <account> [-s <sus>] [-m <sus>] [-g <sus>] [-c <sus>] [--dry-run]
     crc_bank.py info <account>
-    crc_bank.py usage <account>
-    crc_bank.py check_sus_limit <account>
-    crc_bank.py check_proposal_end_date <account>
+    crc_bank.py usage <account> [-f <fmt>]
+    crc_bank.py usage --all [-f <fmt>] [--sort <key>] [--top <k>]
+    crc_bank.py check_sus_limit <account> [--dry-run]
+    crc_bank.py check_proposal_end_date <account> [--dry-run]
+    crc_bank.py check_all [--dry-run]
     crc_bank.py check_proposal_violations
+    crc_bank.py verify_associations
     crc_bank.py get_sus <account>
-    crc_bank.py dump <proposal.json> <investor.json> <proposal_archive.json> <investor_archive.json>
+    crc_bank.py lock <accounts>...
+    crc_bank.py unlock <accounts>...
+    crc_bank.py dump <proposal.json> <investor.json> <proposal_archive.json> <investor_archive.json> [-f <fmt>]
     crc_bank.py import_proposal <proposal.json> [-y]
     crc_bank.py import_investor <investor.json> [-y]
+    crc_bank.py send_notifications
+    crc_bank.py sample_usage
+    crc_bank.py migrate
+    crc_bank.py serve [<socket>]
     crc_bank.py -h | --help
     crc_bank.py -v | --version
 
@@ -30,15 +39,22 @@ Options:
     -g --gpu <sus>          The gpu limit in CPU Hours [default: 0]
     -c --htc <sus>          The htc limit in CPU Hours [default: 0]
     -y --yes                Automatically overwrite table
+    -f --format <fmt>       The output format, see below for each command
+    -a --all                Every proposal
+    --sort <key>            Order the accounts by account or pct (largest first) [default: account]
+    --top <k>               Only the first k accounts
+    --dry-run               Print the changes as JSON instead of making them
 
 Positional Arguments:
     <account>               The associated slurm account
+    <accounts>              One or more slurm accounts
     <type>                  The proposal type: proposal or class
     <date>                  Change proposal start date (e.g 12/01/19)
     <sus>                   The number of SUs you want to insert
     <proposal.json>         The proposal table in JSON format
     <investor.json>         The investor table in JSON format
     <investor_archive.json> The investor archival table in JSON format
+    <socket>                The Unix socket to serve on, defaults to server_socket in constants.py
 
 Additional Documentation:
     crc_bank.py insert  # insert for the first time
@@ -46,27 +62,59 @@ Additional Documentation:
     crc_bank.py add     # add SUs on top of current values
     crc_bank.py change  # change to new limits, don't change proposal date
     crc_bank.py renewal # Similar to modify, except rolls over active investments
+    crc_bank.py usage   # --format table (default), json or csv
+    crc_bank.py usage --all # one line per proposal, or every report with --format json or csv
+    crc_bank.py dump    # --format json (default), csv.gz, parquet or arrow, the last two need pyarrow
+    crc_bank.py check_all # check_sus_limit and check_proposal_end_date for every Slurm account
+    crc_bank.py check_all --dry-run # renewal and the checks print what they would change instead
+    crc_bank.py lock    # stop the accounts from running jobs on every cluster
+    crc_bank.py unlock  # allow the accounts to run jobs again
+    crc_bank.py verify_associations # list the proposals missing Slurm associations
+    crc_bank.py send_notifications # deliver the queued emails
+    crc_bank.py sample_usage # record the usage that changed since the last sample
+    crc_bank.py migrate # upgrade crc_bank.db to the latest schema, run after every update
+    crc_bank.py serve   # answer info, usage and get_sus as JSON over a Unix socket
 """
 
 
 from docopt import docopt
 from datetime import date, timedelta
-import utils
-import json
 from math import ceil
 from pathlib import Path
+from copy import copy
+from io import StringIO
+import constants
+
+
+args = docopt(__doc__, version="crc_bank.py version 0.0.1")
+
+# These commands never write, use a read-only connection so they only need
+# read access to the database
+read_only_commands = [
+    "info",
+    "usage",
+    "get_sus",
+    "dump",
+    "check_proposal_violations",
+    "verify_associations",
+    "serve",
+]
+# --dry-run only reads as well
+constants.open_db(
+    read_only=any([args[c] for c in read_only_commands]) or args["--dry-run"]
+)
+
+# Importing the tables connects to the database. Modules with heavy
+# dependencies (checks, dump, history, mailer, migrate, plans, reports) are imported by the commands using them
+import utils
 from constants import (
     CLUSTERS,
+    db,
     proposal_table,
     investor_table,
     proposal_archive_table,
     investor_archive_table,
 )
-from copy import copy
-from io import StringIO
-
-
-args = docopt(__doc__, version="crc_bank.py version 0.0.1")
 
 
 if args["insert"]:
@@ -145,36 +193,13 @@ elif args["investor"]:
 
 elif args["info"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
 
-    # Get entire row, convert to human readable columns
-    od = proposal_table.find_one(account=args["<account>"])
-    od["proposal_type"] = utils.ProposalType(od["proposal_type"]).name
-    od["percent_notified"] = utils.PercentNotified(od["percent_notified"]).name
-    od["start_date"] = od["start_date"].strftime("%m/%d/%y")
-    od["end_date"] = od["end_date"].strftime("%m/%d/%y")
-
-    print("Proposal")
-    print("--------")
-    print(json.dumps(od, indent=2))
-    print()
-
-    ods = investor_table.find(account=args["<account>"])
-    for od in ods:
-        od["proposal_type"] = utils.ProposalType(od["proposal_type"]).name
-        od["start_date"] = od["start_date"].strftime("%m/%d/%y")
-        od["end_date"] = od["end_date"].strftime("%m/%d/%y")
-
-        print(f"Investment: {od['id']:3}")
-        print(f"---------------")
-        print(json.dumps(od, indent=2))
-        print()
+    print(utils.info_string(ctx))
 
 elif args["modify"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
+    od = utils.unwrap_if_right(
         utils.account_exists_in_table(proposal_table, args["<account>"])
     )
 
@@ -182,7 +207,6 @@ elif args["modify"]:
     sus = utils.unwrap_if_right(utils.check_service_units_valid_clusters(args))
 
     # Update row in database
-    od = proposal_table.find_one(account=args["<account>"])
     proposal_duration = utils.get_proposal_duration(
         utils.ProposalType(od["proposal_type"])
     )
@@ -203,7 +227,7 @@ elif args["modify"]:
 
 elif args["add"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
+    od = utils.unwrap_if_right(
         utils.account_exists_in_table(proposal_table, args["<account>"])
     )
 
@@ -213,7 +237,6 @@ elif args["add"]:
     )
 
     # Update row in database
-    od = proposal_table.find_one(account=args["<account>"])
     for clus in CLUSTERS:
         od[clus] += sus[clus]
     proposal_table.update(od, ["id"])
@@ -227,7 +250,7 @@ elif args["add"]:
 
 elif args["change"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
+    od = utils.unwrap_if_right(
         utils.account_exists_in_table(proposal_table, args["<account>"])
     )
 
@@ -235,7 +258,6 @@ elif args["change"]:
     sus = utils.unwrap_if_right(utils.check_service_units_valid_clusters(args))
 
     # Update row in database
-    od = proposal_table.find_one(account=args["<account>"])
     for clus in CLUSTERS:
         od[clus] = sus[clus]
     proposal_table.update(od, ["id"])
@@ -249,7 +271,7 @@ elif args["change"]:
 
 elif args["date"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
+    od = utils.unwrap_if_right(
         utils.account_exists_in_table(proposal_table, args["<account>"])
     )
 
@@ -257,7 +279,6 @@ elif args["date"]:
     start_date = utils.unwrap_if_right(utils.check_date_valid(args["<date>"]))
 
     # Update row in database
-    od = proposal_table.find_one(account=args["<account>"])
     proposal_duration = utils.get_proposal_duration(
         utils.ProposalType(od["proposal_type"])
     )
@@ -292,141 +313,127 @@ elif args["date_investment"]:
     )
 
 elif args["check_sus_limit"]:
-    # This is a complicated function, the steps:
-    # 1. Get proposal for account and compute the total SUs from proposal
-    # 2. Determine the current usage for the user across clusters
-    # 3. Add any investment SUs to the total, archiving any exhausted investments
-    # 4. Add archived investments associated to the current proposal
+    import checks
+    import plans
 
     # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
-
-    # Compute the Total SUs for the proposal period
-    proposal_row = proposal_table.find_one(account=args["<account>"])
-    total_sus = sum([proposal_row[cluster] for cluster in CLUSTERS])
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
 
-    # Parse the used SUs for the proposal period
-    used_sus_per_cluster = {c: 0 for c in CLUSTERS}
-    for cluster in CLUSTERS:
-        used_sus_per_cluster[cluster] = utils.get_raw_usage_in_hours(
-            args["<account>"], cluster
-        )
-    used_sus = sum(used_sus_per_cluster.values())
-
-    # Compute the sum of investment SUs, archiving any exhausted investments
-    investor_rows = investor_table.find(account=args["<account>"])
-    sum_investment_sus = 0
-    for investor_row in investor_rows:
-        # Check if investment is exhausted
-        exhausted = False
-        if investor_row["service_units"] - investor_row[f"withdrawn_sus"] == 0 and (
-            used_sus
-            >= (
-                total_sus
-                + sum_investment_sus
-                + investor_row[f"current_sus"]
-                + investor_row[f"rollover_sus"]
-            )
-            or investor_row[f"current_sus"] + investor_row[f"rollover_sus"] == 0
-        ):
-            exhausted[cluster] = True
-
-        if exhausted:
-            to_insert = {
-                "service_units": investor_row["service_units"],
-                "current_sus": investor_row[f"current_sus"],
-                "rollover_sus": investor_row[f"rollover_sus"],
-                "start_date": investor_row["start_date"],
-                "end_date": investor_row["end_date"],
-                "exhaustion_date": date.today(),
-                "account": args["<account>"],
-                "proposal_id": proposal_row["id"],
-                "investment_id": investor_row["id"],
-            }
-            investor_archive_table.insert(to_insert)
-            investor_table.delete(id=investor_row["id"])
-        else:
-            sum_investment_sus += (
-                investor_row[f"current_sus"] + investor_row[f"rollover_sus"]
-            )
-
-    total_sus += sum_investment_sus
-
-    # Compute the sum of any archived investments associated with this proposal
-    investor_archive_rows = investor_archive_table.find(proposal_id=proposal_row["id"])
-    sum_investor_archive_sus = 0
-    for investor_archive_row in investor_archive_rows:
-        sum_investor_archive_sus += (
-            investor_archive_row[f"current_sus"] + investor_archive_row[f"rollover_sus"]
-        )
+    plan = plans.Plan()
+    (result,) = checks.plan_sus_limits([ctx], plan)
+    _ = utils.unwrap_if_right(plans.run_plan(plan, args["--dry-run"]))
 
-    total_sus += sum_investor_archive_sus
+    if not args["--dry-run"]:
+        _ = utils.unwrap_if_right(result)
 
-    notification_percent = utils.PercentNotified(proposal_row["percent_notified"])
-    if notification_percent == utils.PercentNotified.Hundred:
-        exit(
-            f"Skipping account {args['<account>']} because it should have already been notified and locked"
-        )
-
-    percent_usage = 100.0 * used_sus / total_sus
+elif args["check_proposal_end_date"]:
+    import checks
+    import plans
 
-    # Update percent_notified in the table and notify account owner if necessary
-    updated_notification_percent = utils.find_next_notification(percent_usage)
-    if updated_notification_percent != notification_percent:
-        proposal_row["percent_notified"] = updated_notification_percent.value
-        proposal_table.update(proposal_row, ["id"])
-        utils.notify_sus_limit(args["<account>"])
+    # Account must exist in database
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
+
+    plan = plans.Plan()
+    checks.plan_proposal_end_dates([ctx], plan)
+    _ = utils.unwrap_if_right(plans.run_plan(plan, args["--dry-run"]))
+
+elif args["check_all"]:
+    import checks
+    import forecast
+    import plans
+
+    # Load every proposal and investment once, grouped for quick lookups
+    proposal_rows = {row["account"]: row for row in proposal_table.all()}
+    investor_rows = utils.group_by(investor_table.all(), "account")
+    investor_archive_rows = utils.group_by(investor_archive_table.all(), "proposal_id")
+
+    # Read the usage for every account with a single sshare call, and fit
+    # the burn rates the emails project the exhaustion with in one pass
+    _ = utils.get_usage_snapshot()
+    _ = forecast.get_burn_rates()
+
+    # Every Slurm account should have a proposal, collect the ones that don't
+    missing = []
+    contexts = []
+    for account in utils.get_slurm_accounts():
+        if account not in proposal_rows:
+            missing.append(account)
+            continue
 
-        utils.log_action(
-            f"Updated proposal percent_notified to {updated_notification_percent} for {args['<account>']}"
+        proposal_row = proposal_rows[account]
+        contexts.append(
+            utils.AccountContext(
+                proposal_row,
+                investor_rows[account],
+                investor_archive_rows[proposal_row["id"]],
+            )
         )
 
-    # Lock the account if necessary
-    if updated_notification_percent == utils.PercentNotified.Hundred:
-        utils.lock_account(args["<account>"])
-
-        utils.log_action(
-            f"The account for {args['<account>']} was locked due to SUs limit"
+    # Plan the SU limits of every account at once, then the end dates. The
+    # whole plan is applied together
+    plan = plans.Plan()
+    results = checks.plan_sus_limits(contexts, plan)
+    checks.plan_proposal_end_dates(contexts, plan)
+    applied = plans.run_plan(plan, args["--dry-run"])
+
+    if not args["--dry-run"]:
+        for result in results:
+            if isinstance(result, utils.Left):
+                print(result.reason)
+
+    errors = []
+    if isinstance(applied, utils.Left):
+        errors.append(applied.reason)
+    if missing:
+        errors.append(f"Unable to find an account for: {', '.join(missing)}")
+    if errors:
+        exit("\n".join(errors))
+
+elif args["lock"]:
+    locked, errors = utils.lock_accounts(args["<accounts>"])
+    if locked:
+        utils.log_action(f"Locked accounts: {', '.join(locked)}")
+    if errors:
+        exit("\n".join(errors))
+
+elif args["unlock"]:
+    unlocked, errors = utils.unlock_accounts(args["<accounts>"])
+    if unlocked:
+        utils.log_action(f"Unlocked accounts: {', '.join(unlocked)}")
+    if errors:
+        exit("\n".join(errors))
+
+elif args["verify_associations"]:
+    # Every proposal against a single dump of the associations
+    index = utils.load_association_index()
+    missing = []
+    for proposal_row in proposal_table.find(order_by="account"):
+        x = utils.account_and_cluster_associations_exists(
+            proposal_row["account"], index
         )
+        if isinstance(x, utils.Left):
+            missing.append(x.reason)
 
-elif args["check_proposal_end_date"]:
-    # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
-
-    proposal_row = proposal_table.find_one(account=args["<account>"])
-    today = date.today()
-    three_months_before_end_date = proposal_row["end_date"] - timedelta(days=90)
-
-    if today == three_months_before_end_date:
-        utils.three_month_proposal_expiry_notification(args["<account>"])
-    elif today == proposal_row["end_date"]:
-        utils.proposal_expires_notification(args["<account>"])
-        utils.lock_account(args["<account>"])
-        utils.log_action(
-            f"The account for {args['<account>']} was locked because it reached the end date {proposal_row['end_date']}"
-        )
+    if missing:
+        exit("\n".join(missing))
 
 elif args["get_sus"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
 
-    proposal_row = proposal_table.find_one(account=args["<account>"])
+    print(utils.get_sus_string(ctx))
 
-    print(f"type,{','.join(CLUSTERS)}")
-    sus = [str(proposal_row[c]) for c in CLUSTERS]
-    print(f"proposal,{','.join(sus)}")
+elif args["dump"]:
+    import dump
 
-    investor_sus = utils.get_current_investor_sus(args["<account>"])
-    for row in investor_sus:
-        print(f"investment,{row}")
+    tables = [
+        proposal_table,
+        investor_table,
+        proposal_archive_table,
+        investor_archive_table,
+    ]
+    write = utils.unwrap_if_right(dump.get_writer(args["--format"] or "json", tables))
 
-elif args["dump"]:
     proposal_p = Path(args["<proposal.json>"])
     investor_p = Path(args["<investor.json>"])
     proposal_archive_p = Path(args["<proposal_archive.json>"])
@@ -441,16 +448,16 @@ elif args["dump"]:
             f"ERROR: Neither {proposal_p}, {investor_p}, {proposal_archive_p}, nor {investor_archive_p} can exist."
         )
     else:
-        utils.freeze_if_not_empty(proposal_table.all(), proposal_p)
-        utils.freeze_if_not_empty(investor_table.all(), investor_p)
-        utils.freeze_if_not_empty(proposal_archive_table.all(), proposal_archive_p)
-        utils.freeze_if_not_empty(investor_archive_table.all(), investor_archive_p)
+        # One read transaction, so the four files agree with each other
+        with db:
+            for table, path in zip(
+                tables, [proposal_p, investor_p, proposal_archive_p, investor_archive_p]
+            ):
+                write(table, path)
 
 elif args["withdraw"]:
     # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
 
     # Service units should be a valid number
     sus_to_withdraw = utils.unwrap_if_right(
@@ -458,20 +465,16 @@ elif args["withdraw"]:
     )
 
     # First check if the user has enough SUs to withdraw
-    available_investments = sum(utils.get_available_investor_sus(args["<account>"]))
+    available_investments = sum(utils.get_available_investor_sus(ctx))
 
-    should_exit = False
     if sus_to_withdraw > available_investments:
-        should_exit = True
-        print(
-            f"Requested to withdraw {sus_to_withdraw[c]} on cluster {c} but the account only has {available_investments[c]} SUs to withdraw from on this cluster!"
+        exit(
+            f"Requested to withdraw {sus_to_withdraw} but the account only has {available_investments} SUs to withdraw!"
         )
-    if should_exit:
-        exit()
 
     # Go through investments, oldest first and start withdrawing
-    investments = investor_table.find(account=args["<account>"])
-    for idx, investment in enumerate(investments):
+    withdrawals = []
+    for idx, investment in enumerate(ctx.investments):
         to_withdraw = 0
         investment_remaining = (
             investment["service_units"] - investment[f"withdrawn_sus"]
@@ -492,49 +495,85 @@ elif args["withdraw"]:
             to_withdraw = sus_to_withdraw
             sus_to_withdraw = 0
 
-        # Update the current investment and log withdrawal
+        # Update the current investment
         investment[f"current_sus"] += to_withdraw
         investment[f"withdrawn_sus"] += to_withdraw
-        investor_table.update(investment, ["id"])
-        utils.log_action(
-            f"Withdrew from investment {investment['id']} for account {args['<account>']} with value {to_withdraw}"
-        )
+        withdrawals.append((investment, to_withdraw))
 
         # Determine if we are done processing investments
         if sus_to_withdraw == 0:
             print(f"Finished withdrawing after {idx} iterations")
             break
 
+    # Write every updated investment in a single transaction, then log withdrawals
+    with db:
+        investor_table.update_many(
+            [dict(investment) for investment, _ in withdrawals], ["id"]
+        )
+
+    for investment, to_withdraw in withdrawals:
+        utils.log_action(
+            f"Withdrew from investment {investment['id']} for account {args['<account>']} with value {to_withdraw}"
+        )
+
 elif args["check_proposal_violations"]:
-    # Iterate over all of the proposals looking for proposal violations
-    proposals = proposal_table.find()
-    for proposal in proposals:
-        investments = sum(utils.get_available_investor_sus(proposal["account"]))
-
-        subtract_previous_investment = 0
-        for cluster in CLUSTERS:
-            avail_sus = proposal[cluster]
-            used_sus = utils.get_raw_usage_in_hours(proposal["account"], cluster)
-            if used_sus > (avail_sus + investments - subtract_investment):
-                print(
-                    f"Account {proposal['account']}, Cluster {cluster}, Used SUs {used_sus}, Avail SUs {avail_sus}, Investment SUs {investments[cluster]}"
-                )
-            if used_sus > avail_sus:
-                subtract_previous_investment += investments - used_sus
+    import checks
+
+    # Load every proposal, investment and the usage once, then check the
+    # proposals. Violations are reported sorted by account
+    proposal_rows = sorted(proposal_table.all(), key=lambda row: row["account"])
+    investor_rows = utils.group_by(investor_table.all(), "account")
+    _ = utils.get_usage_snapshot()
+
+    contexts = [
+        utils.AccountContext(row, investor_rows[row["account"]])
+        for row in proposal_rows
+    ]
+    violations = checks.find_all_proposal_violations(contexts)
+    for violation in violations:
+        print(violation)
+
+elif args["usage"] and args["--all"]:
+    import forecast
+    import reports
+
+    render = utils.unwrap_if_right(
+        reports.get_renderer(args["--format"] or "table", fleet=True)
+    )
+    sort = utils.unwrap_if_right(reports.check_sort_valid(args["--sort"]))
+    top = None
+    if args["--top"]:
+        top = utils.unwrap_if_right(utils.check_service_units_valid(args["--top"]))
+
+    # Every proposal and investment from one pass over the tables, the usage
+    # of every account from one sshare call per cluster and the burn rates
+    # from one pass over usage_history
+    investor_rows = utils.group_by(investor_table.all(), "account")
+    _ = utils.get_usage_snapshot()
+    _ = forecast.get_burn_rates()
+
+    contexts = [
+        utils.AccountContext(row, investor_rows[row["account"]])
+        for row in proposal_table.all()
+    ]
+    selected = reports.select_accounts(contexts, sort, top)
+    print(render([reports.account_usage(ctx) for ctx in selected]))
 
 elif args["usage"]:
+    import reports
+
+    render = utils.unwrap_if_right(reports.get_renderer(args["--format"] or "table"))
+
     # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
 
-    print(utils.usage_string(args["<account>"]))
+    print(render(reports.account_usage(ctx)))
 
 elif args["renewal"]:
+    import plans
+
     # Account must exist in database
-    _ = utils.unwrap_if_right(
-        utils.account_exists_in_table(proposal_table, args["<account>"])
-    )
+    ctx = utils.unwrap_if_right(utils.load_account_context(args["<account>"]))
 
     # Account associations better exist!
     _ = utils.unwrap_if_right(
@@ -544,110 +583,42 @@ elif args["renewal"]:
     # Make sure SUs are valid
     sus = utils.unwrap_if_right(utils.check_service_units_valid_clusters(args))
 
-    # Archive current proposal, recording the usage on each cluster
-    current_proposal = proposal_table.find_one(account=args["<account>"])
-    proposal_id = current_proposal["id"]
-    current_usage = {
-        c: utils.get_raw_usage_in_hours(args["<account>"], c) for c in CLUSTERS
-    }
-    to_insert = {f"{c}_usage": current_usage[c] for c in CLUSTERS}
-    for key in ["account", "start_date", "end_date"] + CLUSTERS:
-        to_insert[key] = current_proposal[key]
-    proposal_archive_table.insert(to_insert)
-
-    # Archive any investments which are
-    # - past their end_date
-    # - withdraw + renewal leaves no current_sus and fully withdrawn account
-    investor_rows = investor_table.find(account=args["<account>"])
-    for investor_row in investor_rows:
-        archive = False
-        if investor_row["end_date"] <= date.today():
-            archive = True
-        elif (
-            investor_row["current_sus"] == 0
-            and investor_row["withdrawn_sus"] == investor_row["service_units"]
-        ):
-            archive = True
-
-        if archive:
-            to_insert = {
-                "service_units": investor_row["service_units"],
-                "current_sus": investor_row[f"current_sus"],
-                "start_date": investor_row["start_date"],
-                "end_date": investor_row["end_date"],
-                "exhaustion_date": date.today(),
-                "account": args["<account>"],
-                "proposal_id": current_proposal["id"],
-                "investor_id": investor_row["id"],
-            }
-            investor_archive_table.insert(to_insert)
-            investor_table.delete(id=investor_row["id"])
-
-    # Renewal, should exclude any previously rolled over SUs
-    current_investments = sum(
-        utils.get_current_investor_sus_no_rollover(args["<account>"])
-    )
-
-    # If there are relevant investments,
-    #     check if there is any rollover
-    if current_investments != 0:
-        need_to_rollover = 0
-        # If current usage exceeds proposal, rollover some SUs, else rollover all SUs
-        total_usage = sum([current_usage[c] for c in CLUSTERS])
-        total_proposal_sus = sum([current_proposal[c] for c in CLUSTERS])
-        if total_usage > total_proposal_sus:
-            need_to_rollover = total_proposal_sus + current_investments - total_usage
-        else:
-            need_to_rollover = current_investments
-        # Only half should rollover
-        need_to_rollover /= 2
-
-        # If the current usage exceeds proposal + investments or there is no investment, no need to rollover
-        if need_to_rollover < 0 or current_investments == 0:
-            need_to_rollover = 0
-
-        if need_to_rollover > 0:
-            # Go through investments and roll them over
-            investor_rows = investor_table.find(account=args["<account>"])
-            for investor_row in investor_rows:
-                if need_to_rollover > 0:
-                    to_withdraw = (
-                        investor_row[f"service_units"] - investor_row[f"withdrawn_sus"]
-                    ) // utils.years_left(investor_row["end_date"])
-                    to_rollover = int(
-                        investor_row[f"current_sus"]
-                        if investor_row[f"current_sus"] < need_to_rollover
-                        else need_to_rollover
-                    )
-                    investor_row[f"current_sus"] = to_withdraw
-                    investor_row[f"rollover_sus"] = to_rollover
-                    investor_row[f"withdrawn_sus"] += to_withdraw
-                    investor_table.update(investor_row, ["id"])
-                    need_to_rollover -= to_rollover
-
-    # Insert new proposal
-    proposal_type = utils.ProposalType(current_proposal["proposal_type"])
-    proposal_duration = utils.get_proposal_duration(proposal_type)
-    start_date = date.today()
-    end_date = start_date + proposal_duration
-    update_with = {
-        "percent_notified": utils.PercentNotified.Zero.value,
-        "start_date": start_date,
-        "end_date": end_date,
-        "id": proposal_id,
-    }
-    for c in CLUSTERS:
-        update_with[c] = sus[c]
-    proposal_table.update(update_with, ["id"])
-
-    # Unlock the account
-    utils.unlock_account(args["<account>"])
+    plan = plans.Plan()
+    plans.plan_renewals([(ctx, sus)], plan)
+    _ = utils.unwrap_if_right(plans.run_plan(plan, args["--dry-run"]))
 
 elif args["import_proposal"]:
-    utils.import_from_json(args, proposal_table, utils.ProposalType.Proposal)
+    import dump
+
+    dump.import_from_json(args, proposal_table, utils.ProposalType.Proposal)
 
 elif args["import_investor"]:
-    utils.import_from_json(args, investor_table, utils.ProposalType.Investor)
+    import dump
+
+    dump.import_from_json(args, investor_table, utils.ProposalType.Investor)
+
+elif args["send_notifications"]:
+    import mailer
+
+    sent, failed = utils.unwrap_if_right(mailer.send_queued_notifications())
+    if failed:
+        exit(f"Sent {sent} notifications, {failed} failed and will be retried")
+
+elif args["sample_usage"]:
+    import history
+
+    rows = history.sample_usage()
+    print(f"Recorded usage for {len(rows)} associations")
+
+elif args["serve"]:
+    import server
+
+    server.serve(args["<socket>"])
+
+elif args["migrate"]:
+    import migrate
+
+    migrate.migrate_database()
 
 else:
     raise NotImplementedError("The requested command isn't implemented yet.")
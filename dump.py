@@ -0,0 +1,213 @@
+from datetime import date, datetime
+import csv
+import gzip
+import json
+import textwrap
+from constants import dump_page_size, import_chunk_size
+from utils import ProposalType, Left, Right
+
+
+def default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dump_json(table, path):
+    # The same layout datafreeze wrote, streamed `dump_page_size` rows at a
+    # time from the cursor
+    count = table.count()
+    with open(path, "w") as f:
+        if count == 0:
+            f.write("{}\n")
+            return
+
+        f.write(f'{{\n  "count": {count},\n  "results": [\n')
+        for i, row in enumerate(table.find(_step=dump_page_size)):
+            if i > 0:
+                f.write(",\n")
+            f.write(textwrap.indent(json.dumps(row, default=default, indent=2), "    "))
+        f.write('\n  ],\n  "meta": {}\n}')
+
+
+def dump_csv_gz(table, path):
+    # CSV has no types, dates are written as ISO 8601 like in the JSON
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.columns)
+        for row in table.find(_step=dump_page_size):
+            writer.writerow(
+                [v.isoformat() if isinstance(v, date) else v for v in row.values()]
+            )
+
+
+def arrow_types():
+    # The Python types of the columns, see check_arrow_columns
+    import pyarrow as pa
+
+    return {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+        date: pa.date32(),
+        datetime: pa.timestamp("us"),
+    }
+
+
+def python_type(column):
+    # None for the SQL types without a Python equivalent
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def arrow_schema(table):
+    import pyarrow as pa
+
+    if not table.exists:
+        return pa.schema([])
+    types = arrow_types()
+    return pa.schema([(c.name, types[python_type(c)]) for c in table.table.columns])
+
+
+def check_arrow_columns(tables):
+    types = [bool, int, float, str, date, datetime]
+    for table in tables:
+        if not table.exists:
+            continue
+        for c in table.table.columns:
+            if python_type(c) not in types:
+                return Left(
+                    f"Column `{c.name}` of `{table.name}` has type {c.type}, which can't be written as Arrow, try `--format csv.gz`"
+                )
+    return Right(tables)
+
+
+def record_batches(table, schema):
+    import pyarrow as pa
+
+    for page in chunked(table.find(_step=dump_page_size), dump_page_size):
+        yield pa.RecordBatch.from_pylist(page, schema=schema)
+
+
+def dump_parquet(table, path):
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(table)
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in record_batches(table, schema):
+            writer.write_batch(batch)
+
+
+def dump_arrow(table, path):
+    import pyarrow as pa
+
+    schema = arrow_schema(table)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in record_batches(table, schema):
+            writer.write_batch(batch)
+
+
+writers = {
+    "json": dump_json,
+    "csv.gz": dump_csv_gz,
+    "parquet": dump_parquet,
+    "arrow": dump_arrow,
+}
+
+
+def get_writer(fmt, tables):
+    # Checked before anything is written
+    if fmt not in writers:
+        return Left(
+            f"Unknown dump format `{fmt}`, expected one of {', '.join(writers)}"
+        )
+    if fmt in ["parquet", "arrow"]:
+        x = check_arrow_columns(tables)
+        if isinstance(x, Left):
+            return x
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            return Left(
+                f"The {fmt} format requires pyarrow ({e}), try `--format csv.gz`"
+            )
+    return Right(writers[fmt])
+
+
+def iter_results(fp, read_size=65536):
+    # Decode the rows of "results" one at a time, reading `read_size`
+    # characters whenever the buffer doesn't hold a complete row
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        start = buffer.find('"results"')
+        if start != -1 and buffer.find("[", start) != -1:
+            buffer = buffer[buffer.find("[", start) + 1 :]
+            break
+        chunk = fp.read(read_size)
+        if not chunk:
+            return
+        buffer += chunk
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = fp.read(read_size)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ask_destructive(args):
+    if args["--yes"]:
+        choice = "yes"
+    else:
+        print(
+            "DANGER: This function OVERWRITES crc_bank.db, are you sure you want to do this? [y/N]"
+        )
+        choice = input().lower()
+    return choice
+
+
+def import_from_json(args, table, table_type):
+    choice = ask_destructive(args)
+    if choice == "yes" or choice == "y":
+        if table_type == ProposalType.Proposal:
+            filename = "<proposal.json>"
+        elif table_type == ProposalType.Investor:
+            filename = "<investor.json>"
+        else:
+            raise ValueError
+        with open(args[filename], "r") as fp, table.db:
+            # Replace the rows, keeping the table and its indexes
+            table.delete()
+            for chunk in chunked(iter_results(fp), import_chunk_size):
+                for item in chunk:
+                    item["start_date"] = date.fromisoformat(item["start_date"])
+                    item["end_date"] = date.fromisoformat(item["end_date"])
+                    del item["id"]
+
+                table.insert_many(chunk)
@@ -0,0 +1,145 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from constants import (
+    CLUSTERS,
+    db,
+    usage_history_table,
+    forecast_window_days,
+    date_format,
+)
+from utils import get_usage_for_account, get_current_investor_sus
+
+
+def fit_burn_rates(accounts, days, hours):
+    # Least squares slope of cumulative usage against time for every account
+    # at once. `accounts` are integer codes, the points are sorted by account
+    # then time, `hours` is the usage since the previous point
+    import numpy as np
+
+    cumulative = np.cumsum(hours)
+    starts = np.flatnonzero(np.r_[True, np.diff(accounts) != 0])
+    sizes = np.diff(np.r_[starts, len(accounts)])
+    before = np.repeat(cumulative[starts] - hours[starts], sizes)
+    y = cumulative - before
+
+    # Centered on each account's mean time, the sums stay exact enough to
+    # tell an account whose points are all at the same time
+    n = np.bincount(accounts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(accounts, weights=days) / n
+    t = days - mean[accounts]
+    stt = np.bincount(accounts, weights=t * t, minlength=len(n))
+    sty = np.bincount(accounts, weights=t * y, minlength=len(n))
+    spread = np.zeros(len(n))
+    spread[accounts[starts]] = days[starts + sizes - 1] - days[starts]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(spread > 0, sty / stt, np.nan)
+
+
+def first_samples(accounts=None):
+    # The time of the first account total sampled for `accounts`, or every
+    # account
+    query = (
+        "SELECT account, MIN(sampled_at) AS sampled_at FROM usage_history "
+        "WHERE user = ''"
+    )
+    params = {}
+    if accounts is not None:
+        params = {f"account{i}": account for i, account in enumerate(accounts)}
+        query += f" AND account IN ({', '.join([f':{p}' for p in params])})"
+    return db.query(f"{query} GROUP BY account", **params)
+
+
+def load_burn_rates(accounts=None):
+    # SUs per day of `accounts` (or every account) over the last
+    # `forecast_window_days`, from the account totals in usage_history. Each
+    # account's points start at zero when the window (or its sampling) starts
+    # and end now, samples are only recorded when the usage changes
+    if not usage_history_table.exists:
+        return {}
+    now = datetime.now()
+    window_start = now - timedelta(days=forecast_window_days)
+
+    # Without usage in the window every rate is 0, numpy is slow to import
+    filters = {"user": "", "sampled_at": {">": window_start}}
+    if accounts is not None:
+        filters["account"] = list(accounts)
+    window = list(usage_history_table.find(**filters))
+    if not window:
+        return {}
+
+    import numpy as np
+
+    # One point per account and time: the totals of every cluster are sampled
+    # at the same time, their deltas are added together
+    names = []
+    points = defaultdict(int)
+    for row in first_samples(accounts):
+        first_sample = datetime.fromisoformat(str(row["sampled_at"]))
+        names.append(row["account"])
+        points[(len(names) - 1, max(first_sample, window_start))] += 0
+        points[(len(names) - 1, now)] += 0
+    codes = {name: i for i, name in enumerate(names)}
+
+    for row in window:
+        points[(codes[row["account"]], row["sampled_at"])] += row["delta"]
+
+    account_codes = np.array([code for code, _ in points])
+    days = np.array([(t - now).total_seconds() / 86400.0 for _, t in points])
+    hours = np.array(list(points.values()), dtype=float) / 3600.0
+    # Sorted by account then time, the points at `now` come last
+    order = np.lexsort((days, account_codes))
+    rates = fit_burn_rates(account_codes[order], days[order], hours[order])
+    return {name: rates[i] for name, i in codes.items()}
+
+
+_burn_rates = {}
+# The accounts fitted so far, None once every account was
+_fitted_accounts = set()
+
+
+def get_burn_rates(accounts=None):
+    # Each account is fitted once per process. Commands about a few accounts
+    # only read their samples, `accounts=None` fits every account in one go
+    global _fitted_accounts
+    if _fitted_accounts is None:
+        return _burn_rates
+    if accounts is None:
+        _burn_rates.update(load_burn_rates())
+        _fitted_accounts = None
+        return _burn_rates
+
+    missing = set(accounts) - _fitted_accounts
+    if missing:
+        _burn_rates.update(load_burn_rates(sorted(missing)))
+        _fitted_accounts |= missing
+    return _burn_rates
+
+
+def reset_burn_rates():
+    global _fitted_accounts
+    _burn_rates.clear()
+    _fitted_accounts = set()
+
+
+def projected_exhaustion(ctx):
+    # The date the proposal and investment SUs run out at the current burn
+    # rate, None without recent usage
+    rate = get_burn_rates([ctx.account]).get(ctx.account)
+    if rate is None or not rate > 0:
+        return None
+    total = sum([ctx.proposal[c] for c in CLUSTERS]) + sum(
+        get_current_investor_sus(ctx)
+    )
+    days_left = max(total - get_usage_for_account(ctx.account), 0) / rate
+    if days_left > 36500:
+        return None
+    return date.today() + timedelta(days=days_left)
+
+
+def exhaustion_string(exhaustion, end_date):
+    if exhaustion is None:
+        return "N/A"
+    if exhaustion > end_date:
+        return f"{exhaustion.strftime(date_format)} (after the end date)"
+    return exhaustion.strftime(date_format)
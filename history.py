@@ -0,0 +1,52 @@
+from datetime import datetime
+from constants import db, usage_history_table
+from utils import refresh_usage_snapshot, unwrap_if_right
+
+
+def latest_samples():
+    # {(account, cluster, user): raw_usage} from the newest sample of each
+    if not usage_history_table.exists:
+        return {}
+    rows = db.query(
+        "SELECT account, cluster, user, raw_usage FROM usage_history WHERE id IN "
+        "(SELECT MAX(id) FROM usage_history GROUP BY account, cluster, user)"
+    )
+    return {(r["account"], r["cluster"], r["user"]): r["raw_usage"] for r in rows}
+
+
+def sample_usage():
+    # Record the RawUsage (seconds) of every (account, cluster, user) that
+    # changed since the last sample, read with one sshare call per cluster.
+    # Like the usage snapshot, user "" is the account total
+    snapshot = unwrap_if_right(refresh_usage_snapshot())
+    previous = latest_samples()
+    sampled_at = datetime.now()
+
+    rows = []
+    for key, raw_usage in snapshot.raw_usage.items():
+        account, cluster, user = key
+        if key not in previous:
+            # The first sample is the baseline
+            delta = 0
+        elif raw_usage == previous[key]:
+            continue
+        elif raw_usage < previous[key]:
+            # RawUsage was reset by a renewal, everything since is new usage
+            delta = raw_usage
+        else:
+            delta = raw_usage - previous[key]
+
+        rows.append(
+            {
+                "account": account,
+                "cluster": cluster,
+                "user": user,
+                "sampled_at": sampled_at,
+                "raw_usage": raw_usage,
+                "delta": delta,
+            }
+        )
+
+    with db:
+        usage_history_table.insert_many(rows)
+    return rows
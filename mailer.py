@@ -0,0 +1,114 @@
+from smtplib import SMTP, SMTPException, SMTPServerDisconnected
+from email.message import EmailMessage
+from datetime import datetime
+from constants import (
+    db,
+    notification_table,
+    email_suffix,
+    send_email_from,
+    smtp_host,
+    smtp_port,
+    notification_batch_size,
+    notification_max_attempts,
+)
+from utils import run_command, Left, Right
+from templates import html_to_text
+
+
+def get_account_emails():
+    # The Description field of every account holds the email prefix, read
+    # them all with one sacctmgr call
+    o, _ = run_command("sacctmgr show account -P format=account,description -n")
+
+    emails = {}
+    for line in o.split("\n"):
+        if "|" in line:
+            account, description = line.strip().split("|", 1)
+            emails[account] = f"{description}{email_suffix}"
+    return emails
+
+
+def build_message(notification, emails):
+    # Emails queued before the text was rendered with the HTML
+    email_text = notification.get("text") or html_to_text(notification["html"])
+
+    msg = EmailMessage()
+    msg.set_content(email_text)
+    msg.add_alternative(notification["html"], subtype="html")
+    msg["Subject"] = notification["subject"]
+    msg["From"] = send_email_from
+    msg["To"] = emails[notification["account"]]
+    return msg
+
+
+def pending_notifications(after_id):
+    return list(
+        notification_table.find(
+            sent_at=None,
+            attempts={"<": notification_max_attempts},
+            id={">": after_id},
+            order_by="id",
+            _limit=notification_batch_size,
+        )
+    )
+
+
+def send_queued_notifications():
+    # Deliver the queued notifications over a single SMTP session, oldest
+    # first in batches. Failed notifications are retried by the next call
+    # until they reach `notification_max_attempts`
+    sent = 0
+    failed = 0
+
+    # The columns written after a delivery attempt come from the migrations
+    if "sent_at" not in notification_table.columns:
+        return Left("The notification queue is out of date, run `crc_bank.py migrate`")
+
+    batch = pending_notifications(0)
+    if not batch:
+        return Right((sent, failed))
+
+    emails = get_account_emails()
+    try:
+        session = SMTP(smtp_host, smtp_port)
+    except OSError as e:
+        # The oldest batch counts the attempt, everything is retried next time
+        reason = f"Unable to connect to {smtp_host}:{smtp_port}: {e}"
+        for notification in batch:
+            notification["attempts"] += 1
+            notification["last_error"] = reason
+        with db:
+            notification_table.update_many([dict(n) for n in batch], ["id"])
+        return Left(reason)
+
+    with session:
+        while batch:
+            disconnected = False
+            for notification in batch:
+                if notification["account"] not in emails:
+                    notification["attempts"] += 1
+                    notification["last_error"] = "The account has no email in sacctmgr"
+                    failed += 1
+                    continue
+
+                try:
+                    session.send_message(build_message(notification, emails))
+                    notification["sent_at"] = datetime.now()
+                    sent += 1
+                except (SMTPException, OSError) as e:
+                    notification["attempts"] += 1
+                    notification["last_error"] = str(e)
+                    failed += 1
+                    # Without a session the rest waits for the next call
+                    if isinstance(e, (SMTPServerDisconnected, OSError)):
+                        disconnected = True
+                        break
+
+            with db:
+                notification_table.update_many([dict(n) for n in batch], ["id"])
+
+            if disconnected:
+                break
+            batch = pending_notifications(batch[-1]["id"])
+
+    return Right((sent, failed))
@@ -0,0 +1,13 @@
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from constants import db
+
+
+def migrate_database():
+    # Upgrade the database configured in constants.py to the latest schema
+    config = Config(str(Path(__file__).parent / "alembic.ini"))
+    config.set_main_option("script_location", str(Path(__file__).parent / "migrations"))
+    with db.engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
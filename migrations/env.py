@@ -0,0 +1,20 @@
+from alembic import context
+from constants import db
+
+config = context.config
+
+
+def run_migrations_online():
+    # `crc_bank.py migrate` passes its own connection, the alembic CLI uses the
+    # database configured in constants.py
+    connection = config.attributes.get("connection")
+    if connection is None:
+        connection = db.executable
+
+    context.configure(connection=connection, render_as_batch=True)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+run_migrations_online()
@@ -0,0 +1,107 @@
+"""Explicit schema with indexes on account and proposal_id
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from constants import CLUSTERS
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# The columns `dataset` used to create on the first insert, one per table.
+# The cluster columns come from CLUSTERS in constants.py
+def columns():
+    return {
+        "proposal": [
+            sa.Column("account", sa.UnicodeText),
+            sa.Column("proposal_type", sa.BigInteger),
+            sa.Column("percent_notified", sa.BigInteger),
+            sa.Column("start_date", sa.Date),
+            sa.Column("end_date", sa.Date),
+        ]
+        + [sa.Column(c, sa.BigInteger) for c in CLUSTERS],
+        "investor": [
+            sa.Column("account", sa.UnicodeText),
+            sa.Column("proposal_type", sa.BigInteger),
+            sa.Column("start_date", sa.Date),
+            sa.Column("end_date", sa.Date),
+            sa.Column("service_units", sa.BigInteger),
+            sa.Column("current_sus", sa.BigInteger),
+            sa.Column("withdrawn_sus", sa.BigInteger),
+            sa.Column("rollover_sus", sa.BigInteger),
+        ],
+        "proposal_archive": [
+            sa.Column("account", sa.UnicodeText),
+            sa.Column("start_date", sa.Date),
+            sa.Column("end_date", sa.Date),
+        ]
+        + [sa.Column(c, sa.BigInteger) for c in CLUSTERS]
+        + [sa.Column(f"{c}_usage", sa.BigInteger) for c in CLUSTERS],
+        "investor_archive": [
+            sa.Column("account", sa.UnicodeText),
+            sa.Column("proposal_id", sa.Integer),
+            sa.Column("investor_id", sa.Integer),
+            sa.Column("service_units", sa.BigInteger),
+            sa.Column("current_sus", sa.BigInteger),
+            sa.Column("rollover_sus", sa.BigInteger),
+            sa.Column("start_date", sa.Date),
+            sa.Column("end_date", sa.Date),
+            sa.Column("exhaustion_date", sa.Date),
+        ],
+    }
+
+
+# (table, columns, unique)
+indexes = [
+    ("proposal", ["account"], True),
+    ("investor", ["account"], False),
+    ("proposal_archive", ["account"], False),
+    ("investor_archive", ["account"], False),
+    ("investor_archive", ["proposal_id"], False),
+    ("investor_archive", ["investor_id"], False),
+]
+
+
+def index_name(table, cols):
+    return f"ix_{table}_{'_'.join(cols)}"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = inspector.get_table_names()
+
+    for table, cols in columns().items():
+        if table not in existing_tables:
+            op.create_table(table, sa.Column("id", sa.Integer, primary_key=True), *cols)
+            continue
+
+        # Tables created by `dataset` only have the columns that were inserted
+        existing_cols = [c["name"] for c in inspector.get_columns(table)]
+        for col in cols:
+            if col.name not in existing_cols:
+                op.add_column(table, col)
+
+    # Archived investments used to be written with `investment_id` by
+    # check_sus_limit and `investor_id` by renewal, keep `investor_id`
+    archive_cols = [c["name"] for c in inspector.get_columns("investor_archive")]
+    if "investment_id" in archive_cols:
+        op.execute(
+            "UPDATE investor_archive SET investor_id = investment_id WHERE investor_id IS NULL"
+        )
+
+    for table, cols, unique in indexes:
+        op.create_index(index_name(table, cols), table, cols, unique=unique)
+
+
+def downgrade():
+    for table, cols, _ in reversed(indexes):
+        op.drop_index(index_name(table, cols), table_name=table)
@@ -0,0 +1,52 @@
+"""Queue for outgoing notification emails
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def columns():
+    return [
+        sa.Column("account", sa.UnicodeText),
+        sa.Column("subject", sa.UnicodeText),
+        sa.Column("html", sa.UnicodeText),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("attempts", sa.BigInteger),
+        sa.Column("last_error", sa.UnicodeText),
+        sa.Column("sent_at", sa.DateTime),
+    ]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "notification_queue" not in inspector.get_table_names():
+        op.create_table(
+            "notification_queue",
+            sa.Column("id", sa.Integer, primary_key=True),
+            *columns(),
+        )
+    else:
+        # `dataset` creates the table on the first queued email, without the
+        # columns only written after a delivery attempt
+        existing_cols = [c["name"] for c in inspector.get_columns("notification_queue")]
+        for col in columns():
+            if col.name not in existing_cols:
+                op.add_column("notification_queue", col)
+
+    op.create_index("ix_notification_queue_sent_at", "notification_queue", ["sent_at"])
+
+
+def downgrade():
+    op.drop_index("ix_notification_queue_sent_at", table_name="notification_queue")
+    op.drop_table("notification_queue")
@@ -0,0 +1,28 @@
+"""Plain text version of the queued notification emails
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_cols = [c["name"] for c in inspector.get_columns("notification_queue")]
+    if "text" not in existing_cols:
+        op.add_column("notification_queue", sa.Column("text", sa.UnicodeText))
+
+
+def downgrade():
+    with op.batch_alter_table("notification_queue") as batch_op:
+        batch_op.drop_column("text")
@@ -0,0 +1,42 @@
+"""Usage history sampled from sshare
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+index_cols = ["account", "cluster", "user", "sampled_at"]
+index_name = f"ix_usage_history_{'_'.join(index_cols)}"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # `dataset` creates the table on the first sample
+    if "usage_history" not in inspector.get_table_names():
+        op.create_table(
+            "usage_history",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("account", sa.UnicodeText),
+            sa.Column("cluster", sa.UnicodeText),
+            sa.Column("user", sa.UnicodeText),
+            sa.Column("sampled_at", sa.DateTime),
+            sa.Column("raw_usage", sa.BigInteger),
+            sa.Column("delta", sa.BigInteger),
+        )
+    op.create_index(index_name, "usage_history", index_cols)
+
+
+def downgrade():
+    op.drop_index(index_name, table_name="usage_history")
+    op.drop_table("usage_history")
@@ -0,0 +1,35 @@
+"""Store percent_notified as the percentage of the last threshold
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+# percent_notified used to be the position in the thresholds, which were
+# fixed to these percentages
+positions = [0, 25, 50, 75, 90, 100]
+
+
+def remap(pairs):
+    cases = " ".join([f"WHEN {old} THEN {new}" for old, new in pairs])
+    op.execute(
+        f"UPDATE proposal SET percent_notified = CASE percent_notified {cases} ELSE percent_notified END"
+    )
+
+
+def upgrade():
+    remap([(i, p) for i, p in enumerate(positions)])
+
+
+def downgrade():
+    remap([(p, i) for i, p in enumerate(positions)])
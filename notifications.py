@@ -0,0 +1,84 @@
+from datetime import datetime
+from constants import (
+    date_format,
+    notify_sus_limit_email_text,
+    three_month_proposal_expiry_notification_email,
+    proposal_expires_notification_email,
+    super_cluster,
+)
+from utils import stored_notification
+from reports import usage_string
+from templates import Template
+
+
+# Compiled once, each email only fills in the placeholders
+sus_limit_template = Template(notify_sus_limit_email_text)
+three_month_expiry_template = Template(three_month_proposal_expiry_notification_email)
+expires_template = Template(proposal_expires_notification_email)
+
+
+def get_investment_status(ctx):
+    total_investment_h = "Total Investment SUs"
+    start_date_h = "Start Date"
+    current_sus_h = "Current SUs"
+    withdrawn_h = "Withdrawn SUs"
+    rollover_h = "Rollover SUs"
+
+    total_investment_w = 20
+    start_date_w = 10
+    current_sus_w = 11
+    withdrawn_w = 13
+    rollover_w = 12
+
+    result_s = f"{total_investment_h} | {start_date_h} | {current_sus_h} | {withdrawn_h} | {rollover_h}\n"
+
+    for row in ctx.investments:
+        result_s += f"{row['service_units']:20} | {row['start_date'].strftime(date_format):>10} | {row['current_sus']:11} | {row['withdrawn_sus']:13} | {row['rollover_sus']:12}\n"
+
+    return result_s
+
+
+def sus_limit_email(ctx):
+    proposal_row = ctx.proposal
+
+    investment_s = get_investment_status(ctx)
+
+    values = {
+        "percent": stored_notification(
+            proposal_row["percent_notified"]
+        ).to_percentage(),
+        "start_date": proposal_row["start_date"].strftime(date_format),
+        "usage": usage_string(ctx),
+        "investments": investment_s,
+    }
+
+    return email(sus_limit_template, values, ctx.account)
+
+
+def proposal_dates(ctx):
+    return {
+        "account": ctx.account,
+        "end_date": ctx.proposal["end_date"].strftime(date_format),
+        "start_date": ctx.proposal["start_date"].strftime(date_format),
+    }
+
+
+def three_month_proposal_expiry_email(ctx):
+    return email(three_month_expiry_template, proposal_dates(ctx), ctx.account)
+
+
+def proposal_expires_email(ctx):
+    return email(expires_template, proposal_dates(ctx), ctx.account)
+
+
+def email(template, values, account):
+    # The notification_queue row of one email, `crc_bank.py send_notifications`
+    # delivers it
+    return {
+        "account": account,
+        "subject": f"Your allocation on {super_cluster} for account: {account}",
+        "html": template.render_html(**values),
+        "text": template.render_text(**values),
+        "created_at": datetime.now(),
+        "attempts": 0,
+    }
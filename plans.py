@@ -0,0 +1,205 @@
+from collections import defaultdict
+from datetime import date
+import json
+from constants import (
+    CLUSTERS,
+    db,
+    proposal_table,
+    investor_table,
+    proposal_archive_table,
+    investor_archive_table,
+    notification_table,
+)
+from utils import (
+    PercentNotified,
+    ProposalType,
+    get_proposal_duration,
+    get_usage_snapshot,
+    get_raw_usage_in_hours,
+    get_current_investor_sus_no_rollover,
+    years_left,
+    lock_accounts,
+    unlock_accounts,
+    invalidate_usage,
+    log_action,
+    Left,
+    Right,
+)
+from dump import default
+
+
+class Plan:
+    # Everything a command changes, computed in memory for every account first.
+    # `apply_plan` writes it with one transaction and batched sacctmgr calls,
+    # `--dry-run` prints it instead. Rows are the dicts written to the tables
+    def __init__(self):
+        self.proposal_archives = []
+        self.proposal_updates = []
+        self.investor_archives = []
+        self.investor_deletes = []
+        self.investor_updates = []
+        self.notifications = []
+        self.lock = []
+        self.unlock = []
+        self.log = []
+        self.skipped = []
+
+    def to_json(self):
+        # The text of each email has the same content as its HTML
+        result = dict(vars(self))
+        result["notifications"] = [
+            {k: v for k, v in row.items() if k != "html"} for row in self.notifications
+        ]
+        return json.dumps(result, default=default, indent=2)
+
+
+def update_rows(table, rows):
+    # update_many sets the columns of the first row on every row, update rows
+    # with the same columns together
+    groups = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(row))].append(dict(row))
+    for group in groups.values():
+        table.update_many(group, ["id"])
+
+
+def apply_plan(plan):
+    with db:
+        if plan.proposal_archives:
+            proposal_archive_table.insert_many(plan.proposal_archives)
+        if plan.investor_archives:
+            investor_archive_table.insert_many(plan.investor_archives)
+        if plan.investor_deletes:
+            investor_table.delete(id={"in": plan.investor_deletes})
+        update_rows(investor_table, plan.investor_updates)
+        update_rows(proposal_table, plan.proposal_updates)
+        if plan.notifications:
+            notification_table.insert_many(plan.notifications)
+
+    _, lock_errors = lock_accounts(plan.lock)
+    _, unlock_errors = unlock_accounts(plan.unlock)
+    # Usage read before a renewal shouldn't be used after it, locking only
+    # invalidates the accounts it changed
+    invalidate_usage([row["account"] for row in plan.proposal_archives])
+    for message in plan.log:
+        log_action(message)
+
+    # The database is already written, a failed sacctmgr call is logged and
+    # the accounts can be locked (or unlocked) again with `lock`/`unlock`
+    errors = lock_errors + unlock_errors
+    for error in errors:
+        log_action(error)
+    if errors:
+        return Left("\n".join(errors))
+    return Right(plan)
+
+
+def run_plan(plan, dry_run):
+    if dry_run:
+        print(plan.to_json())
+        return Right(plan)
+    return apply_plan(plan)
+
+
+def plan_renewals(renewals, plan):
+    # `renewals` is a list of (ctx, sus), the new proposal of ctx.account gets
+    # `sus[cluster]` on each cluster
+    today = date.today()
+    _ = get_usage_snapshot([ctx.account for ctx, _ in renewals])
+    for ctx, sus in renewals:
+        plan_renewal(ctx, sus, today, plan)
+
+
+def plan_renewal(ctx, sus, today, plan):
+    # Archive current proposal, recording the usage on each cluster
+    current_proposal = ctx.proposal
+    current_usage = {c: get_raw_usage_in_hours(ctx.account, c) for c in CLUSTERS}
+    proposal_archive = {f"{c}_usage": current_usage[c] for c in CLUSTERS}
+    for key in ["account", "start_date", "end_date"] + CLUSTERS:
+        proposal_archive[key] = current_proposal[key]
+    plan.proposal_archives.append(proposal_archive)
+
+    # Archive any investments which are
+    # - past their end_date
+    # - withdraw + renewal leaves no current_sus and fully withdrawn account
+    for investor_row in list(ctx.investments):
+        archive = False
+        if investor_row["end_date"] <= today:
+            archive = True
+        elif (
+            investor_row["current_sus"] == 0
+            and investor_row["withdrawn_sus"] == investor_row["service_units"]
+        ):
+            archive = True
+
+        if archive:
+            plan.investor_archives.append(
+                {
+                    "service_units": investor_row["service_units"],
+                    "current_sus": investor_row["current_sus"],
+                    "rollover_sus": investor_row["rollover_sus"],
+                    "start_date": investor_row["start_date"],
+                    "end_date": investor_row["end_date"],
+                    "exhaustion_date": today,
+                    "account": ctx.account,
+                    "proposal_id": current_proposal["id"],
+                    "investor_id": investor_row["id"],
+                }
+            )
+            plan.investor_deletes.append(investor_row["id"])
+            ctx.investments.remove(investor_row)
+
+    # Renewal, should exclude any previously rolled over SUs
+    current_investments = sum(get_current_investor_sus_no_rollover(ctx))
+
+    # If there are relevant investments,
+    #     check if there is any rollover
+    if current_investments != 0:
+        need_to_rollover = 0
+        # If current usage exceeds proposal, rollover some SUs, else rollover all SUs
+        total_usage = sum([current_usage[c] for c in CLUSTERS])
+        total_proposal_sus = sum([current_proposal[c] for c in CLUSTERS])
+        if total_usage > total_proposal_sus:
+            need_to_rollover = total_proposal_sus + current_investments - total_usage
+        else:
+            need_to_rollover = current_investments
+        # Only half should rollover
+        need_to_rollover /= 2
+
+        # If the current usage exceeds proposal + investments or there is no investment, no need to rollover
+        if need_to_rollover < 0 or current_investments == 0:
+            need_to_rollover = 0
+
+        if need_to_rollover > 0:
+            # Go through investments and roll them over
+            for investor_row in ctx.investments:
+                if need_to_rollover > 0:
+                    to_withdraw = (
+                        investor_row["service_units"] - investor_row["withdrawn_sus"]
+                    ) // years_left(investor_row["end_date"])
+                    to_rollover = int(
+                        investor_row["current_sus"]
+                        if investor_row["current_sus"] < need_to_rollover
+                        else need_to_rollover
+                    )
+                    investor_row["current_sus"] = to_withdraw
+                    investor_row["rollover_sus"] = to_rollover
+                    investor_row["withdrawn_sus"] += to_withdraw
+                    plan.investor_updates.append(dict(investor_row))
+                    need_to_rollover -= to_rollover
+
+    # The new proposal replaces the current one
+    proposal_type = ProposalType(current_proposal["proposal_type"])
+    update_with = {
+        "percent_notified": PercentNotified.Zero.value,
+        "start_date": today,
+        "end_date": today + get_proposal_duration(proposal_type),
+        "id": current_proposal["id"],
+    }
+    for c in CLUSTERS:
+        update_with[c] = sus[c]
+    current_proposal.update(update_with)
+    plan.proposal_updates.append(update_with)
+
+    # Unlock the account
+    plan.unlock.append(ctx.account)
@@ -0,0 +1,271 @@
+from collections import namedtuple
+import heapq
+from io import StringIO
+import csv
+import json
+from constants import CLUSTERS
+from utils import (
+    Left,
+    Right,
+    get_usage_snapshot,
+    get_current_investor_sus,
+    convert_to_hours,
+)
+from forecast import projected_exhaustion, exhaustion_string
+
+
+# Usage of one account in SUs, the percentages are None when nothing is
+# available to use
+UserUsage = namedtuple("UserUsage", ["user", "used", "percent"])
+ClusterUsage = namedtuple(
+    "ClusterUsage", ["cluster", "available", "used", "percent", "users"]
+)
+AccountUsage = namedtuple(
+    "AccountUsage",
+    [
+        "account",
+        "clusters",
+        "proposal_total",
+        "investments",
+        "used",
+        "percent_no_investments",
+        "percent",
+        "end_date",
+        "projected_exhaustion",
+    ],
+)
+
+
+def percent_of(used, available):
+    return None if available == 0 else 100.0 * used / available
+
+
+def aggregate_used(ctx):
+    snapshot = get_usage_snapshot([ctx.account])
+    return sum([convert_to_hours(snapshot.get(ctx.account, c)) for c in CLUSTERS])
+
+
+def aggregate_percent(ctx):
+    # Percentage of the proposal and investment SUs used, without building
+    # the whole report. Proposals without SUs sort last
+    total = sum([ctx.proposal[c] for c in CLUSTERS]) + sum(
+        get_current_investor_sus(ctx)
+    )
+    percent = percent_of(aggregate_used(ctx), total)
+    return -1.0 if percent is None else percent
+
+
+# (key, largest first)
+sort_keys = {
+    "account": (lambda ctx: ctx.account, False),
+    "pct": (aggregate_percent, True),
+}
+
+
+def select_accounts(contexts, sort, top=None):
+    # With `top` only the first `top` accounts are kept in a heap, instead of
+    # sorting all of them
+    key, largest = sort_keys[sort]
+    if top is None:
+        return sorted(contexts, key=key, reverse=largest)
+    if largest:
+        return heapq.nlargest(top, contexts, key=key)
+    return heapq.nsmallest(top, contexts, key=key)
+
+
+def account_usage(ctx):
+    account = ctx.account
+    proposal = ctx.proposal
+    snapshot = get_usage_snapshot([account])
+
+    clusters = []
+    for cluster in CLUSTERS:
+        users = []
+        for user in snapshot.get_users(account, cluster):
+            used = convert_to_hours(snapshot.get(account, cluster, user))
+            users.append(UserUsage(user, used, percent_of(used, proposal[cluster])))
+        used = convert_to_hours(snapshot.get(account, cluster))
+        clusters.append(
+            ClusterUsage(
+                cluster,
+                proposal[cluster],
+                used,
+                percent_of(used, proposal[cluster]),
+                users,
+            )
+        )
+
+    proposal_total = sum([proposal[c] for c in CLUSTERS])
+    investments = sum(get_current_investor_sus(ctx))
+    used = sum([c.used for c in clusters])
+    return AccountUsage(
+        account,
+        clusters,
+        proposal_total,
+        investments,
+        used,
+        percent_of(used, proposal_total),
+        percent_of(used, proposal_total + investments),
+        proposal["end_date"],
+        projected_exhaustion(ctx),
+    )
+
+
+def render_table(usage):
+    with StringIO() as output:
+        for cluster in usage.clusters:
+            output.write(f"|{'-' * 82}|\n")
+            output.write(
+                f"|{'Cluster: ' + cluster.cluster + ', Available SUs: ' + str(cluster.available):^82}|\n"
+            )
+            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
+            output.write(
+                f"|{'User':^20}|{'SUs Used':^30}|{'Percentage of Total':^30}|\n"
+            )
+            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
+            for user in cluster.users:
+                if user.percent is None:
+                    output.write(f"|{user.user:^20}|{user.used:^30}|{'N/A':^30}|\n")
+                else:
+                    output.write(
+                        f"|{user.user:^20}|{user.used:^30}|{user.percent:^30.2f}|\n"
+                    )
+            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
+            if cluster.percent is None:
+                output.write(f"|{'Overall':^20}|{cluster.used:^30d}|{'N/A':^30}|\n")
+            else:
+                output.write(
+                    f"|{'Overall':^20}|{cluster.used:^30d}|{cluster.percent:^30.2f}|\n"
+                )
+            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
+        output.write(f"|{'Aggregate':^82}|\n")
+        output.write(f"|{'-' * 40:^40}|{'-' * 41:^41}|\n")
+        if usage.investments > 0:
+            investments_total = f"{usage.investments:d}^a"
+            output.write(f"|{'Investments Total':^40}|{investments_total:^41}|\n")
+            output.write(
+                f"|{'Aggregate Usage (no investments)':^40}|{usage.percent_no_investments:^41.2f}|\n"
+            )
+        output.write(f"|{'Aggregate Usage':^40}|{usage.percent:^41.2f}|\n")
+        output.write(
+            f"|{'Projected Exhaustion':^40}|{exhaustion_string(usage.projected_exhaustion, usage.end_date):^41}|\n"
+        )
+        if usage.investments > 0:
+            output.write(f"|{'-' * 40:^40}|{'-' * 41:^41}|\n")
+            output.write(
+                f"|{'^a Investment SUs can be used across any cluster':^82}|\n"
+            )
+        output.write(f"|{'-' * 82}|\n")
+        return output.getvalue().strip()
+
+
+def usage_to_dict(usage):
+    result = usage._asdict()
+    result["clusters"] = [c._asdict() for c in usage.clusters]
+    for cluster in result["clusters"]:
+        cluster["users"] = [u._asdict() for u in cluster["users"]]
+    for key in ["end_date", "projected_exhaustion"]:
+        if result[key] is not None:
+            result[key] = result[key].isoformat()
+    return result
+
+
+def render_json(usage):
+    return json.dumps(usage_to_dict(usage))
+
+
+csv_header = ["account", "cluster", "user", "available", "used", "percent"]
+
+
+def csv_rows(usage):
+    # One row per user, the cluster total has user "" and the aggregate has
+    # cluster "" like the usage snapshot
+    for cluster in usage.clusters:
+        for user in cluster.users:
+            yield [
+                usage.account,
+                cluster.cluster,
+                user.user,
+                cluster.available,
+                user.used,
+                user.percent,
+            ]
+        yield [
+            usage.account,
+            cluster.cluster,
+            "",
+            cluster.available,
+            cluster.used,
+            cluster.percent,
+        ]
+    available = usage.proposal_total + usage.investments
+    yield [usage.account, "", "", available, usage.used, usage.percent]
+
+
+def render_csv(usage):
+    with StringIO() as output:
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(csv_header)
+        writer.writerows(csv_rows(usage))
+        return output.getvalue().strip()
+
+
+def render_fleet_table(usages):
+    # One line per account with the percentage used on each cluster
+    header = f"|{'Account':^20}|" + "".join([f"{c:^10}|" for c in CLUSTERS])
+    header += f"{'Aggregate':^10}|{'Projected Exhaustion':^32}|"
+    widths = [20] + [10] * len(CLUSTERS) + [10, 32]
+    separator = "|" + "|".join(["-" * w for w in widths]) + "|"
+
+    def percent(value):
+        return "N/A" if value is None else f"{value:.2f}"
+
+    lines = [separator, header, separator]
+    for usage in usages:
+        exhaustion = exhaustion_string(usage.projected_exhaustion, usage.end_date)
+        line = f"|{usage.account:^20}|"
+        line += "".join([f"{percent(c.percent):^10}|" for c in usage.clusters])
+        line += f"{percent(usage.percent):^10}|{exhaustion:^32}|"
+        lines.append(line)
+    lines.append(separator)
+    return "\n".join(lines)
+
+
+def render_fleet_json(usages):
+    return json.dumps([usage_to_dict(usage) for usage in usages])
+
+
+def render_fleet_csv(usages):
+    with StringIO() as output:
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(csv_header)
+        for usage in usages:
+            writer.writerows(csv_rows(usage))
+        return output.getvalue().strip()
+
+
+renderers = {"table": render_table, "json": render_json, "csv": render_csv}
+fleet_renderers = {
+    "table": render_fleet_table,
+    "json": render_fleet_json,
+    "csv": render_fleet_csv,
+}
+
+
+def get_renderer(fmt, fleet=False):
+    choices = fleet_renderers if fleet else renderers
+    if fmt not in choices:
+        return Left(
+            f"Unknown usage format `{fmt}`, expected one of {', '.join(choices)}"
+        )
+    return Right(choices[fmt])
+
+
+def check_sort_valid(sort):
+    if sort not in sort_keys:
+        return Left(f"Unknown sort `{sort}`, expected one of {', '.join(sort_keys)}")
+    return Right(sort)
+
+
+def usage_string(ctx):
+    return render_table(account_usage(ctx))
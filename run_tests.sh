@@ -1,8 +1,8 @@
 #!/usr/bin/env bash
 
-rm test.db proposal.json investor.json proposal_archive.json investor_archive.json
+rm test.db test.db-wal test.db-shm proposal.json investor.json proposal_archive.json investor_archive.json
 
-if [ $(grep -c "^db = dataset.connect(\"sqlite:///crc_bank.db\")" constants.py) -eq 0 ]; then
+if [ $(grep -c "^db_path = \"test.db\"" constants.py) -eq 1 ]; then
     sudo sacctmgr -i modify account where account=sam cluster=smp,gpu,mpi,htc set rawusage=0
     for bat in $(ls tests/*.bats); do
         echo "====== BEGIN $bat ======"
@@ -13,5 +13,5 @@ if [ $(grep -c "^db = dataset.connect(\"sqlite:///crc_bank.db\")" constants.py)
         echo "======  END $bat  ======"
     done
 else
-    echo "ERROR: please modify \`db = ...\` in \`constants.py\` to work on a test database!"
+    echo "ERROR: please modify \`db_path = ...\` in \`constants.py\` to work on a test database!"
 fi
@@ -0,0 +1,117 @@
+import json
+import os
+import socket
+import socketserver
+from threading import Thread
+from time import sleep
+from constants import (
+    server_socket,
+    server_socket_mode,
+    server_usage_ttl,
+    server_client_timeout,
+)
+import utils
+import forecast
+import reports
+
+
+# The commands the server answers, each one returns what crc_bank.py prints
+commands = {
+    "info": utils.info_string,
+    "usage": reports.usage_string,
+    "get_sus": utils.get_sus_string,
+}
+
+
+def handle_request(request):
+    if not isinstance(request, dict):
+        return utils.Left("Requests should be JSON objects")
+
+    command = request.get("command")
+    if command not in commands:
+        return utils.Left(
+            f"Unknown command `{command}`, expected one of `{','.join(commands)}`"
+        )
+
+    account = request.get("account")
+    if not isinstance(account, str):
+        return utils.Left("Requests need an `account`")
+
+    x = utils.load_account_context(account)
+    if isinstance(x, utils.Left):
+        return x
+
+    # Report a failed sshare instead of exiting
+    usage = utils.fetch_usage_snapshot([account])
+    if isinstance(usage, utils.Left):
+        return usage
+    return utils.Right(commands[command](x.value))
+
+
+class BankRequestHandler(socketserver.StreamRequestHandler):
+    # One JSON request per line, answered with one JSON response per line:
+    #   {"command": "usage", "account": "sam"}
+    #   {"status": "ok", "output": "..."} or {"status": "error", "reason": "..."}
+    # A client idle for `server_client_timeout` seconds is disconnected
+    timeout = server_client_timeout
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                self.respond(line)
+        except socket.timeout:
+            pass
+
+    def respond(self, line):
+        try:
+            result = handle_request(json.loads(line))
+        except ValueError:
+            result = utils.Left("Requests should be valid JSON")
+
+        if isinstance(result, utils.Left):
+            response = {"status": "error", "reason": result.reason}
+        else:
+            response = {"status": "ok", "output": result.value}
+        self.wfile.write(f"{json.dumps(response)}\n".encode("utf-8"))
+
+
+class BankServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Each connection is handled in its own thread, `dataset` opens a database
+    # connection per thread. The usage snapshot is shared and replaced by a
+    # background thread, so requests never wait for sshare
+    daemon_threads = True
+
+    def server_activate(self):
+        super().server_activate()
+        self.refresh_usage()
+        Thread(target=self.refresh_usage_forever, daemon=True).start()
+
+    def refresh_usage(self):
+        # When sshare fails the previous usage is kept until the next refresh
+        x = utils.refresh_usage_snapshot()
+        if isinstance(x, utils.Left):
+            utils.log_action(x.reason)
+        forecast.reset_burn_rates()
+
+    def refresh_usage_forever(self):
+        while True:
+            sleep(server_usage_ttl)
+            self.refresh_usage()
+
+
+def serve(socket_path=None):
+    if socket_path is None:
+        socket_path = server_socket
+
+    # Remove the socket left behind by a previous server
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    with BankServer(socket_path, BankRequestHandler) as server:
+        os.chmod(socket_path, server_socket_mode)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
@@ -0,0 +1,64 @@
+from string import Formatter
+from html import escape
+from html.parser import HTMLParser
+
+
+class TextExtractor(HTMLParser):
+    # Keeps the text between the tags, like the text part of an email
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def html_to_text(html):
+    parser = TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.parts)
+
+
+class Template:
+    # Compiles an HTML email with named placeholders, e.g. `{account}` or
+    # `{percent:.0f}`, once into (literal, placeholder) pairs for its HTML and
+    # text versions, so rendering only joins the pieces. Placeholders can't be
+    # inside a tag
+    def __init__(self, html):
+        self.html_parts = []
+        self.text_parts = []
+        for literal, field, spec, conversion in Formatter().parse(html):
+            if field == "":
+                raise ValueError("Template placeholders must be named")
+            if spec and "{" in spec:
+                raise ValueError(f"The format of `{{{field}}}` can't use placeholders")
+            placeholder = None if field is None else (field, conversion, spec)
+            self.html_parts.append((literal, placeholder))
+            self.text_parts.append((html_to_text(literal), placeholder))
+
+    @staticmethod
+    def fill(placeholder, values, escaped):
+        if placeholder is None:
+            return ""
+        field, conversion, spec = placeholder
+        value = values[field]
+        if conversion:
+            value = Formatter().convert_field(value, conversion)
+        value = format(value, spec)
+        return escape(value, quote=False) if escaped else value
+
+    @classmethod
+    def render(cls, parts, values, escaped):
+        return "".join(
+            [
+                literal + cls.fill(placeholder, values, escaped)
+                for literal, placeholder in parts
+            ]
+        )
+
+    def render_html(self, **values):
+        return self.render(self.html_parts, values, True)
+
+    def render_text(self, **values):
+        return self.render(self.text_parts, values, False)
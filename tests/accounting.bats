@@ -0,0 +1,21 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "SusLimits matches the rules for one account" {
+    run python tests/accounting.py
+    [ "$status" -eq 0 ]
+
+    clean
+}
+
+@test "check_sus_limit keeps existing proposals when thresholds change" {
+    # percent_notified:usage%:new percent_notified, 95 was added
+    run python tests/thresholds.py 25,50,75,90,95,100 \
+        0:10:- 25:30:- 75:80:- 90:92:- 90:96:95 75:96:95 90:101:100 100:120:skip
+    [ "$status" -eq 0 ]
+
+    # 75 was removed, proposals notified at 75 aren't notified at 50 again
+    run python tests/thresholds.py 25,50,90,100 75:80:- 75:91:90 90:95:-
+    [ "$status" -eq 0 ]
+}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+""" accounting.py -- Compare accounting.SusLimits with the rules for one account
+Usage:
+    accounting.py [-n <accounts>] [-s <seeds>]
+    accounting.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+    -n --accounts <n>       How many random accounts per seed [default: 200]
+    -s --seeds <seeds>      How many random fleets to compare [default: 20]
+
+Exits with the first difference, run it from the directory you run crc_bank.py from
+"""
+
+from copy import deepcopy
+from datetime import date
+from pathlib import Path
+from random import Random
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+from constants import CLUSTERS
+import utils
+from utils import AccountContext, PercentNotified, UsageSnapshot, stored_notification
+from accounting import SusLimits
+from plans import Plan
+
+
+def expected(ctx, used):
+    # The rules of check_sus_limit for one account: (archived investor ids,
+    # new percent_notified or None, skipped)
+    total = sum([ctx.proposal[c] for c in CLUSTERS])
+    investments = 0
+    archived = []
+    for row in ctx.investments:
+        available = row["current_sus"] + row["rollover_sus"]
+        if row["service_units"] - row["withdrawn_sus"] == 0 and (
+            used >= total + investments + available or available == 0
+        ):
+            archived.append(row["id"])
+        else:
+            investments += available
+    total += investments
+    total += sum(
+        [r["current_sus"] + r["rollover_sus"] for r in ctx.investment_archives]
+    )
+    total += sum(
+        [
+            r["current_sus"] + r["rollover_sus"]
+            for r in ctx.investments
+            if r["id"] in archived
+        ]
+    )
+
+    notified = stored_notification(ctx.proposal["percent_notified"])
+    if notified == PercentNotified.Hundred or total == 0:
+        return archived, None, True
+    updated = utils.find_next_notification(100.0 * used / total)
+    return archived, updated.value if updated != notified else None, False
+
+
+def random_fleet(random, n):
+    snapshot = UsageSnapshot([f"acct{i}" for i in range(n)])
+    contexts = []
+    investor_id = 0
+    for i in range(n):
+        account = f"acct{i}"
+        proposal = {
+            "id": i,
+            "account": account,
+            "percent_notified": random.choice(utils.notification_percentages),
+        }
+        for c in CLUSTERS:
+            proposal[c] = random.choice([0, 0, random.randint(1, 50000)])
+            snapshot.add(
+                account, c, "", random.choice([0, random.randint(0, 60000)]) * 3600
+            )
+
+        investments = []
+        for _ in range(random.randint(0, 3)):
+            investor_id += 1
+            service_units = random.choice([0, random.randint(1, 5) * 5000])
+            investments.append(
+                {
+                    "id": investor_id,
+                    "service_units": service_units,
+                    "withdrawn_sus": random.choice([0, service_units]),
+                    "current_sus": random.choice([0, 1000, service_units // 2]),
+                    "rollover_sus": random.choice([0, random.randint(0, 3000)]),
+                    "start_date": date.today(),
+                    "end_date": date.today(),
+                }
+            )
+        archives = [
+            {"current_sus": random.randint(0, 5000), "rollover_sus": 0}
+            for _ in range(random.choice([0, 0, 1]))
+        ]
+        contexts.append(AccountContext(proposal, investments, archives))
+    return snapshot, contexts
+
+
+args = docopt(__doc__)
+for seed in range(int(args["--seeds"])):
+    snapshot, contexts = random_fleet(Random(seed), int(args["--accounts"]))
+    utils._usage_snapshot = snapshot
+    used = {
+        ctx.account: sum(
+            [utils.get_raw_usage_in_hours(ctx.account, c) for c in CLUSTERS]
+        )
+        for ctx in contexts
+    }
+    rules = [expected(deepcopy(ctx), used[ctx.account]) for ctx in contexts]
+
+    limits = SusLimits(contexts).compute()
+    plan = Plan()
+    changed = {ctx.account for ctx in limits.plan(plan)}
+
+    for i, (ctx, (archived, updated, skipped)) in enumerate(zip(contexts, rules)):
+        result = (
+            [
+                a["investor_id"]
+                for a in plan.investor_archives
+                if a["account"] == ctx.account
+            ],
+            ctx.proposal["percent_notified"] if ctx.account in changed else None,
+            bool(limits.skipped[i] or limits.no_sus[i]),
+        )
+        if result != (archived, updated, skipped):
+            sys.exit(
+                f"seed {seed}, {ctx.account}: SusLimits {result}, expected {(archived, updated, skipped)}"
+            )
+        if bool(limits.locked[i]) != (updated == PercentNotified.Hundred.value):
+            sys.exit(f"seed {seed}, {ctx.account}: locked is {limits.locked[i]}")
+
+print(f"SusLimits matches the rules for {args['--seeds']} fleets")
@@ -0,0 +1,26 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "check_all reports accounts without a proposal" {
+    run python crc_bank.py check_all
+    [ "$status" -eq 1 ]
+    [ $(echo $output | grep -c "sam") -eq 1 ]
+
+    clean
+}
+
+@test "check_all skips accounts with a proposal" {
+    # insert proposal should work
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py check_all
+    [ $(echo $output | grep -c "Unable to find an account for:.*sam") -eq 0 ]
+
+    # the proposal is still there
+    run python crc_bank.py info sam
+    [ "$status" -eq 0 ]
+
+    clean
+}
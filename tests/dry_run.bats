@@ -0,0 +1,37 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "renewal --dry-run prints the plan without changing anything" {
+    # insert proposal should work
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py renewal sam --smp=20000 --dry-run
+    [ "$status" -eq 0 ]
+    [ $(echo $output | grep -c '"proposal_archives"') -eq 1 ]
+    [ $(echo $output | grep -c '"smp": 20000') -eq 1 ]
+
+    # the proposal wasn't renewed
+    run python crc_bank.py dump proposal.json investor.json \
+        proposal_archive.json investor_archive.json
+    [ "$status" -eq 0 ]
+    [ $(grep -c '"smp": 10000' proposal.json) -eq 1 ]
+    [ $(grep -c '"smp_usage"' proposal_archive.json) -eq 0 ]
+
+    # clean up database and JSON files
+    clean
+}
+
+@test "check_all --dry-run prints the plan as JSON" {
+    # insert proposal should work
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py check_all --dry-run
+    [ $(echo $output | grep -c '"proposal_updates"') -eq 1 ]
+    [ $(echo $output | grep -c '"lock"') -eq 1 ]
+
+    # clean up database and JSON files
+    clean
+}
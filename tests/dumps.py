@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+""" dumps.py -- Compare a table dumped as JSON with the same table in another format
+Usage:
+    dumps.py <table.json> <table>
+    dumps.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Positional Arguments:
+    <table.json>            The table dumped with `--format json`
+    <table>                 The table dumped as .csv.gz, .parquet or .arrow
+
+Parquet and Arrow files should keep the types of the columns: date32 for the
+dates, string for the account and int64 for everything else. Exits with the
+first difference
+"""
+
+from datetime import date
+import csv
+import gzip
+import json
+import sys
+from docopt import docopt
+
+
+def normalize(name, value):
+    # CSV has no types, compare every value as the text CSV would hold
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def typed(name, value):
+    # JSON holds the dates as text, Parquet and Arrow as dates
+    if isinstance(value, str) and name.endswith("date"):
+        return date.fromisoformat(value)
+    return value
+
+
+def arrow_type(name):
+    # Every table has dates, the account and integers
+    if name.endswith("date"):
+        return "date32[day]"
+    if name == "account":
+        return "string"
+    return "int64"
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f).get("results", [])
+
+
+def read_csv_gz(path):
+    # CSV has no schema
+    with gzip.open(path, "rt", newline="") as f:
+        return None, list(csv.DictReader(f))
+
+
+def read_parquet(path):
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(path), pq.read_table(path).to_pylist()
+
+
+def read_arrow(path):
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        return table.schema, table.to_pylist()
+
+
+# (read, compare values with)
+readers = {
+    ".csv.gz": (read_csv_gz, normalize),
+    ".parquet": (read_parquet, typed),
+    ".arrow": (read_arrow, typed),
+}
+
+args = docopt(__doc__)
+path = args["<table>"]
+read, convert = [r for ext, r in readers.items() if path.endswith(ext)][0]
+
+schema, rows = read(path)
+if schema is not None:
+    for field in schema:
+        if str(field.type) != arrow_type(field.name):
+            sys.exit(
+                f"Column `{field.name}` of {path} is {field.type}, expected {arrow_type(field.name)}"
+            )
+
+expected = [
+    {k: convert(k, v) for k, v in row.items()}
+    for row in read_json(args["<table.json>"])
+]
+found = [{k: convert(k, v) for k, v in row.items()} for row in rows]
+if found != expected:
+    sys.exit(f"{path} doesn't match {args['<table.json>']}:\n{found}\n{expected}")
+print(f"{path} matches {args['<table.json>']}, {len(found)} rows")
@@ -0,0 +1,8 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "fit_burn_rates matches numpy.polyfit" {
+    run python tests/forecast.py
+    [ "$status" -eq 0 ]
+}
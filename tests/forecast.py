@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" forecast.py -- Compare forecast.fit_burn_rates with numpy.polyfit for each account
+Usage:
+    forecast.py [-n <accounts>] [-s <seeds>]
+    forecast.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+    -n --accounts <n>       How many random accounts per seed [default: 200]
+    -s --seeds <seeds>      How many random sets of samples to compare [default: 20]
+
+Exits with the first difference
+"""
+
+from pathlib import Path
+from random import Random
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+import numpy as np
+from forecast import fit_burn_rates
+
+
+def random_points(random, n):
+    # (account, days, hours) sorted by account then time, some accounts have
+    # a single point or all their points at the same time
+    points = []
+    for account in range(n):
+        size = random.choice([1, 2, random.randint(2, 40)])
+        if random.random() < 0.05:
+            days = [-random.uniform(0, 30)] * size
+        else:
+            days = sorted([-random.uniform(0, 30) for _ in range(size)])
+        for t in days:
+            points.append((account, t, random.choice([0, random.uniform(0, 500)])))
+    return points
+
+
+def expected(days, hours):
+    # The slope of the cumulative usage, NaN when the times are all the same
+    if len(set(days)) < 2:
+        return np.nan
+    return np.polyfit(days, np.cumsum(hours), 1)[0]
+
+
+args = docopt(__doc__)
+for seed in range(int(args["--seeds"])):
+    points = random_points(Random(seed), int(args["--accounts"]))
+    accounts = np.array([p[0] for p in points])
+    days = np.array([p[1] for p in points])
+    hours = np.array([p[2] for p in points])
+    rates = fit_burn_rates(accounts, days, hours)
+
+    for account in range(int(args["--accounts"])):
+        mine = accounts == account
+        rate = expected(days[mine], hours[mine])
+        if not np.isclose(rates[account], rate, rtol=1e-6, atol=1e-6, equal_nan=True):
+            sys.exit(
+                f"Seed {seed}, account {account}: fit_burn_rates gave {rates[account]}, polyfit {rate}"
+            )
+print(f"fit_burn_rates matches numpy.polyfit for {args['--seeds']} sets of samples")
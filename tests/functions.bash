@@ -4,6 +4,8 @@ clean () {
     if [ -f "test.db" ]; then
         rm test.db
     fi
+    rm -f test.db-wal test.db-shm usage_cache.db usage_cache.db-wal usage_cache.db-shm
+    rm -f server.sock
     if [ -f "logs/crc_bank.log" ]; then
         rm logs/crc_bank.log
     fi
@@ -24,3 +26,23 @@ clean () {
 get_raw_usage () {
     echo $(sshare -A $1 -o rawusage -p | sed -n 2p | cut -d'|' -f1)
 }
+
+start_smtp () {
+    port=$(python -c "from constants import smtp_port; print(smtp_port)")
+    python -m aiosmtpd -n -l localhost:$port &
+    echo $! > smtp.pid
+    sleep 1
+}
+
+stop_smtp () {
+    kill $(cat smtp.pid)
+    rm smtp.pid
+}
+
+notification_column () {
+    echo $(python -c "import sqlite3; print(sqlite3.connect('test.db').execute('SELECT $1 FROM notification_queue').fetchone()[0])")
+}
+
+cached_accounts () {
+    echo $(python -c "import sqlite3; print(','.join(sorted({r[0] for r in sqlite3.connect('usage_cache.db').execute('SELECT account FROM usage_cache')})))")
+}
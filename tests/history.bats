@@ -0,0 +1,14 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "sample_usage records baselines, deltas and resets" {
+    run python crc_bank.py migrate
+    [ "$status" -eq 0 ]
+
+    run python tests/history.py
+    [ "$status" -eq 0 ]
+
+    # clean up database and JSON files
+    clean
+}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" history.py -- Check the rows history.sample_usage records
+Usage:
+    history.py
+    history.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Samples made up sshare usage into usage_history, exits with the first
+unexpected row, run it from the directory you run crc_bank.py from
+"""
+
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+from constants import CLUSTERS
+from utils import Right, UsageSnapshot
+import history
+
+cluster = CLUSTERS[0]
+
+
+def sample(raw_usage):
+    # Sample a snapshot with {(account, user): RawUsage} on the first cluster
+    snapshot = UsageSnapshot()
+    for (account, user), raw in raw_usage.items():
+        snapshot.add(account, cluster, user, raw)
+    history.refresh_usage_snapshot = lambda: Right(snapshot)
+    rows = history.sample_usage()
+    return {(r["account"], r["user"]): (r["raw_usage"], r["delta"]) for r in rows}
+
+
+def check(found, expected, what):
+    if found != expected:
+        sys.exit(f"{what} recorded {found}, expected {expected}")
+
+
+args = docopt(__doc__)
+
+# The first sample of every key is the baseline, nothing was used yet
+usage = {("hist1", ""): 3600, ("hist1", "alice"): 3600, ("hist2", ""): 0}
+check(
+    sample(usage),
+    {("hist1", ""): (3600, 0), ("hist1", "alice"): (3600, 0), ("hist2", ""): (0, 0)},
+    "The first sample",
+)
+
+# Then only the keys that changed, with the usage since the previous sample
+usage.update({("hist1", ""): 9000, ("hist1", "bob"): 5400, ("hist2", ""): 0})
+check(
+    sample(usage),
+    {("hist1", ""): (9000, 5400), ("hist1", "bob"): (5400, 0)},
+    "The second sample",
+)
+check(sample(usage), {}, "A sample without new usage")
+
+# A renewal resets RawUsage, the usage since is all new
+usage.update({("hist1", ""): 1800, ("hist1", "alice"): 0, ("hist1", "bob"): 1800})
+check(
+    sample(usage),
+    {
+        ("hist1", ""): (1800, 1800),
+        ("hist1", "alice"): (0, 0),
+        ("hist1", "bob"): (1800, 1800),
+    },
+    "The sample after a renewal",
+)
+
+# The deltas of each key add up to its usage since the baseline
+deltas = history.db.query(
+    "SELECT account, user, SUM(delta) AS used FROM usage_history "
+    "WHERE account IN ('hist1', 'hist2') GROUP BY account, user"
+)
+check(
+    {(r["account"], r["user"]): r["used"] for r in deltas},
+    {
+        ("hist1", ""): 7200,
+        ("hist1", "alice"): 0,
+        ("hist1", "bob"): 1800,
+        ("hist2", ""): 0,
+    },
+    "usage_history",
+)
+print("sample_usage records baselines, deltas and resets")
@@ -0,0 +1,18 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "lock and unlock set GrpTresRunMins" {
+    run python crc_bank.py lock sam
+    [ "$status" -eq 0 ]
+    run sacctmgr -n -P show assoc account=sam format=grptresrunmins
+    [ $(echo $output | grep -c "cpu=0") -eq 1 ]
+
+    run python crc_bank.py unlock sam
+    [ "$status" -eq 0 ]
+    run sacctmgr -n -P show assoc account=sam format=grptresrunmins
+    [ $(echo $output | grep -c "cpu=0") -eq 0 ]
+
+    # clean up database and JSON files
+    clean
+}
@@ -0,0 +1,28 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "migrate upgrades a database written before the migrations" {
+    run python tests/migrations.py create
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py migrate
+    [ "$status" -eq 0 ]
+
+    # percent_notified, investor_id, indexes and the new tables
+    run python tests/migrations.py check
+    [ "$status" -eq 0 ]
+
+    # the upgraded database works and a second migrate changes nothing
+    run python crc_bank.py get_sus baseline1
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py migrate
+    [ "$status" -eq 0 ]
+
+    run python tests/migrations.py check
+    [ "$status" -eq 0 ]
+
+    # clean up database and JSON files
+    clean
+}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+""" migrations.py -- Check that `crc_bank.py migrate` upgrades a database written by the code before the migrations
+Usage:
+    migrations.py create
+    migrations.py check
+    migrations.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Commands:
+    create                  Write the tables of the database in constants.py like the code before the migrations did
+    check                   Check the database after `crc_bank.py migrate`
+
+Exits with the first difference, run it from the directory you run crc_bank.py from
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+import dataset
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from constants import CLUSTERS, db_path
+
+
+# The proposals stored the position of the last threshold exceeded, each
+# account holds one position and the percentage migrate should convert it to
+positions = [0, 25, 50, 75, 90, 100]
+accounts = [f"baseline{i}" for i in range(len(positions))]
+
+start_date = date.today() - timedelta(days=100)
+end_date = start_date + timedelta(days=365)
+
+
+def create():
+    # Only plain `dataset` inserts, the tables get the columns of the first row
+    database = dataset.connect(f"sqlite:///{db_path}")
+    for i, account in enumerate(accounts):
+        row = {
+            "account": account,
+            "proposal_type": 0,
+            "percent_notified": i,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+        for c in CLUSTERS:
+            row[c] = 10000
+        database["proposal"].insert(row)
+
+    investor_id = database["investor"].insert(
+        {
+            "account": accounts[0],
+            "proposal_type": 1,
+            "start_date": start_date,
+            "end_date": end_date,
+            "service_units": 10000,
+            "current_sus": 2000,
+            "withdrawn_sus": 2000,
+            "rollover_sus": 0,
+        }
+    )
+
+    row = {f"{c}_usage": 0 for c in CLUSTERS}
+    for key in ["account", "start_date", "end_date"] + CLUSTERS:
+        row[key] = database["proposal"].find_one(account=accounts[0])[key]
+    database["proposal_archive"].insert(row)
+
+    # check_sus_limit archived with `investment_id`, renewal with `investor_id`
+    # and without `rollover_sus`
+    archive = {
+        "service_units": 10000,
+        "current_sus": 0,
+        "start_date": start_date,
+        "end_date": end_date,
+        "exhaustion_date": date.today(),
+        "account": accounts[0],
+        "proposal_id": 1,
+    }
+    database["investor_archive"].insert(
+        dict(archive, rollover_sus=0, investment_id=investor_id + 1)
+    )
+    database["investor_archive"].insert(dict(archive, investor_id=investor_id + 2))
+
+
+def check():
+    database = dataset.connect(f"sqlite:///{db_path}")
+    head = ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+    if "alembic_version" not in database.tables:
+        sys.exit("Database wasn't migrated")
+    (version,) = database.query("SELECT version_num FROM alembic_version")
+    if version["version_num"] != head:
+        sys.exit(f"Database is at {version['version_num']}, expected {head}")
+
+    for account, percent in zip(accounts, positions):
+        found = database["proposal"].find_one(account=account)["percent_notified"]
+        if found != percent:
+            sys.exit(f"percent_notified of {account} is {found}, expected {percent}")
+
+    archived = [r["investor_id"] for r in database["investor_archive"].all()]
+    if archived != [2, 3]:
+        sys.exit(f"investor_id of the archived investments is {archived}")
+
+    expected = {
+        "proposal": [("ix_proposal_account", 1)],
+        "investor": [("ix_investor_account", 0)],
+        "proposal_archive": [("ix_proposal_archive_account", 0)],
+        "investor_archive": [
+            ("ix_investor_archive_account", 0),
+            ("ix_investor_archive_investor_id", 0),
+            ("ix_investor_archive_proposal_id", 0),
+        ],
+        "notification_queue": [("ix_notification_queue_sent_at", 0)],
+        "usage_history": [("ix_usage_history_account_cluster_user_sampled_at", 0)],
+    }
+    for table, indexes in expected.items():
+        found = sorted(
+            [
+                (row["name"], row["unique"])
+                for row in database.query(f"PRAGMA index_list({table})")
+                if row["origin"] == "c"
+            ]
+        )
+        if found != indexes:
+            sys.exit(f"Indexes of {table} are {found}, expected {indexes}")
+
+    columns = database["notification_queue"].columns
+    for column in ["attempts", "last_error", "sent_at", "text"]:
+        if column not in columns:
+            sys.exit(f"notification_queue has no {column} column")
+
+    print(f"Database is at {head}")
+
+
+args = docopt(__doc__)
+if args["create"]:
+    create()
+else:
+    check()
@@ -0,0 +1,55 @@
+#!/usr/bin/env bats
+
+load functions
+
+queue_expiry_email () {
+    # the queue gets its columns from the migrations
+    run python crc_bank.py migrate
+    [ "$status" -eq 0 ]
+
+    # insert proposal should work
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    # the proposal ends today, which queues an email
+    run python crc_bank.py date sam $(date -d "-365 days" +%m/%d/%y)
+    [ "$status" -eq 0 ]
+    run python crc_bank.py check_proposal_end_date sam
+    [ "$status" -eq 0 ]
+    [ "$(notification_column attempts)" = "0" ]
+}
+
+@test "send_notifications delivers the queued emails" {
+    queue_expiry_email
+
+    start_smtp
+    run python crc_bank.py send_notifications
+    stop_smtp
+    [ "$status" -eq 0 ]
+    [ "$(notification_column sent_at)" != "None" ]
+    [ "$(notification_column attempts)" = "0" ]
+
+    # clean up database and JSON files
+    python crc_bank.py unlock sam
+    clean
+}
+
+@test "send_notifications retries when the SMTP server is down" {
+    queue_expiry_email
+
+    run python crc_bank.py send_notifications
+    [ "$status" -eq 1 ]
+    [ "$(notification_column sent_at)" = "None" ]
+    [ "$(notification_column attempts)" = "1" ]
+
+    start_smtp
+    run python crc_bank.py send_notifications
+    stop_smtp
+    [ "$status" -eq 0 ]
+    [ "$(notification_column sent_at)" != "None" ]
+    [ "$(notification_column attempts)" = "1" ]
+
+    # clean up database and JSON files
+    python crc_bank.py unlock sam
+    clean
+}
@@ -72,3 +72,47 @@ load functions
     clean
     run rm investor.json.init
 }
+
+dump_matches_json () {
+    # dump every table as JSON and as $1, then compare them
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py investor sam 10000
+    [ "$status" -eq 0 ]
+
+    # renewal fills the archive tables
+    run python crc_bank.py renewal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py dump proposal.json investor.json \
+        proposal_archive.json investor_archive.json
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py dump proposal.$1 investor.$1 \
+        proposal_archive.$1 investor_archive.$1 --format $1
+    [ "$status" -eq 0 ]
+
+    for table in proposal investor proposal_archive investor_archive; do
+        run python tests/dumps.py $table.json $table.$1
+        [ "$status" -eq 0 ]
+    done
+
+    # clean up database and dumps
+    clean
+    rm proposal.$1 investor.$1 proposal_archive.$1 investor_archive.$1
+}
+
+@test "roundtrip csv.gz" {
+    dump_matches_json csv.gz
+}
+
+@test "roundtrip parquet" {
+    python -c "import pyarrow" || skip "pyarrow isn't installed"
+    dump_matches_json parquet
+}
+
+@test "roundtrip arrow" {
+    python -c "import pyarrow" || skip "pyarrow isn't installed"
+    dump_matches_json arrow
+}
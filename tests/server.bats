@@ -0,0 +1,23 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "serve answers requests over the socket" {
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    python crc_bank.py serve server.sock &
+    pid=$!
+    for i in $(seq 1 20); do
+        [ -S server.sock ] && break
+        sleep 0.5
+    done
+
+    # answers like the commands, reports errors and drops idle clients
+    run python tests/server.py server.sock sam
+    kill $pid
+    [ "$status" -eq 0 ]
+
+    # clean up database and JSON files
+    clean
+}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+""" server.py -- Check the answers of `crc_bank.py serve`
+Usage:
+    server.py <socket> <account>
+    server.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Positional Arguments:
+    <socket>                The Unix socket the server listens on
+    <account>               An account with a proposal
+
+Exits with the first unexpected answer, run it from the directory you run crc_bank.py from
+"""
+
+from pathlib import Path
+import json
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+from constants import server_client_timeout
+
+
+def connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(server_client_timeout + 10)
+    sock.connect(path)
+    return sock, sock.makefile("rwb")
+
+
+def ask(f, line):
+    f.write(f"{line}\n".encode("utf-8"))
+    f.flush()
+    return json.loads(f.readline())
+
+
+def check(response, status, key, expected):
+    if response.get("status") != status or response.get(key) != expected:
+        sys.exit(f"Expected {status} with {key} {expected!r}, got {response}")
+
+
+args = docopt(__doc__)
+account = args["<account>"]
+
+# A client which never sends anything must not hold up the others
+idle, idle_f = connect(args["<socket>"])
+idle_since = time.monotonic()
+
+_, f = connect(args["<socket>"])
+for command in ["get_sus", "info", "usage"]:
+    printed = subprocess.run(
+        [sys.executable, "crc_bank.py", command, account],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    response = ask(f, json.dumps({"command": command, "account": account}))
+    # print adds the newline
+    check(response, "ok", "output", printed[:-1])
+
+response = ask(f, json.dumps({"command": "get_sus", "account": "not-an-account"}))
+if response.get("status") != "error":
+    sys.exit(f"Expected an error for an unknown account, got {response}")
+response = ask(f, json.dumps({"command": "withdraw", "account": account}))
+check(
+    response,
+    "error",
+    "reason",
+    "Unknown command `withdraw`, expected one of `info,usage,get_sus`",
+)
+response = ask(f, "not json")
+check(response, "error", "reason", "Requests should be valid JSON")
+
+if time.monotonic() - idle_since > server_client_timeout - 1:
+    sys.exit("The requests waited for the idle client")
+
+# The idle client is disconnected after server_client_timeout seconds
+if idle_f.readline() != b"":
+    sys.exit("The idle client got an answer")
+waited = time.monotonic() - idle_since
+if waited < server_client_timeout - 1:
+    sys.exit(f"The idle client was disconnected after {waited:.1f} seconds")
+print(f"Idle client disconnected after {waited:.1f} seconds")
@@ -0,0 +1,8 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "templates render HTML and text" {
+    run python tests/templates.py
+    [ "$status" -eq 0 ]
+}
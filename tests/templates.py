@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+""" templates.py -- Check the HTML and text rendering of templates.Template
+Usage:
+    templates.py
+    templates.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Exits with the first unexpected rendering
+"""
+
+from datetime import date
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+from constants import (
+    notify_sus_limit_email_text,
+    three_month_proposal_expiry_notification_email,
+    proposal_expires_notification_email,
+)
+from templates import Template, html_to_text
+
+
+def check(found, expected):
+    if found != expected:
+        sys.exit(f"Rendered {found!r}, expected {expected!r}")
+
+
+def check_raises(render, error):
+    try:
+        render()
+    except error:
+        return
+    sys.exit(f"Expected {error.__name__}")
+
+
+args = docopt(__doc__)
+
+# The text version drops the tags and decodes the entities
+template = Template("<p>Hello {account},<br>\n<b>usage</b> &amp; {what}</p>")
+check(
+    template.render_text(account="sam", what="more"),
+    "Hello sam,\nusage & more",
+)
+check(
+    template.render_html(account="sam", what="more"),
+    "<p>Hello sam,<br>\n<b>usage</b> &amp; more</p>",
+)
+
+# Formats and conversions, like str.format
+template = Template("{percent:.0f}% {percent} {account!r} [{account:>5}]")
+check(template.render_text(percent=24.6, account="sam"), "25% 24.6 'sam' [  sam]")
+check(
+    template.render_html(percent=24.6, account="sam"),
+    "25% 24.6 'sam' [  sam]",
+)
+check(
+    Template("{start_date:%m/%d/%y}").render_text(start_date=date(2021, 2, 3)),
+    "02/03/21",
+)
+
+# Values are escaped in the HTML only
+template = Template("<pre>{usage}</pre>")
+check(
+    template.render_html(usage="<b>a & b</b>"),
+    "<pre>&lt;b&gt;a &amp; b&lt;/b&gt;</pre>",
+)
+check(template.render_text(usage="<b>a & b</b>"), "<b>a & b</b>")
+
+# The text version of the emails is the text of their HTML
+values = {
+    "percent": 90,
+    "start_date": "01/01/21",
+    "usage": "<sam> & co",
+    "investments": "",
+    "account": "sam",
+    "end_date": "12/31/21",
+}
+for html in [
+    notify_sus_limit_email_text,
+    three_month_proposal_expiry_notification_email,
+    proposal_expires_notification_email,
+]:
+    template = Template(html)
+    check(template.render_text(**values), html_to_text(template.render_html(**values)))
+
+check_raises(lambda: Template("{}"), ValueError)
+check_raises(lambda: Template("{percent:{width}}"), ValueError)
+check_raises(lambda: Template("{percent:.0f}").render_text(percent="90"), ValueError)
+check_raises(lambda: Template("{account!x}").render_text(account="sam"), ValueError)
+check_raises(lambda: Template("{account}").render_text(), KeyError)
+print("Templates render as expected")
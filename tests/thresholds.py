@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+""" thresholds.py -- Check check_sus_limit on existing proposals after changing notification_thresholds
+Usage:
+    thresholds.py <thresholds> <case>...
+    thresholds.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Positional Arguments:
+    <thresholds>            The notification_thresholds to use, e.g. 25,50,75,90,95,100
+    <case>                  <stored>:<usage>:<expected>, a proposal with percent_notified
+                            <stored> which used <usage>% of its SUs. <expected> is the new
+                            percent_notified, `-` when it doesn't change or `skip`
+
+Exits with the first unexpected result, run it from the directory you run crc_bank.py from
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+import constants
+
+args = docopt(__doc__)
+constants.notification_thresholds = [int(p) for p in args["<thresholds>"].split(",")]
+
+from constants import CLUSTERS
+import utils
+from utils import AccountContext, UsageSnapshot, Left
+from checks import plan_sus_limits
+from plans import Plan
+
+cases = [case.split(":") for case in args["<case>"]]
+accounts = [f"acct{i}" for i in range(len(cases))]
+snapshot = UsageSnapshot(accounts)
+contexts = []
+for i, (account, (stored, usage, _)) in enumerate(zip(accounts, cases)):
+    proposal = {
+        "id": i,
+        "account": account,
+        "percent_notified": int(stored),
+        "proposal_type": 0,
+        "start_date": date.today(),
+        "end_date": date.today() + timedelta(days=365),
+    }
+    for c in CLUSTERS:
+        proposal[c] = 0
+        snapshot.add(account, c, "", 0)
+    # 1000 SUs on the first cluster, usage% of them used
+    proposal[CLUSTERS[0]] = 1000
+    snapshot.add(account, CLUSTERS[0], "", int(usage) * 10 * 3600)
+    contexts.append(AccountContext(proposal, [], []))
+utils._usage_snapshot = snapshot
+
+plan = Plan()
+results = plan_sus_limits(contexts, plan)
+updated = {row["id"]: row["percent_notified"] for row in plan.proposal_updates}
+notified = {n["account"]: n["text"] for n in plan.notifications}
+
+for i, (account, (stored, usage, expected), result) in enumerate(
+    zip(accounts, cases, results)
+):
+    case = f"percent_notified {stored} with {usage}% used"
+    if expected == "skip":
+        if not isinstance(result, Left) or account not in plan.skipped:
+            sys.exit(f"{case} wasn't skipped")
+    elif expected == "-":
+        if i in updated or account in notified or account in plan.lock:
+            sys.exit(f"{case} changed to {updated.get(i)}")
+    else:
+        if updated.get(i) != int(expected):
+            sys.exit(f"{case} changed to {updated.get(i)}, expected {expected}")
+        if f"exceeded {float(expected)}% usage" not in notified.get(account, ""):
+            sys.exit(f"{case} wasn't notified of {expected}%")
+        if (account in plan.lock) != (expected == "100"):
+            sys.exit(f"{case} should be locked only at 100")
+print(f"{len(cases)} proposals classified as expected")
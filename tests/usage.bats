@@ -38,3 +38,32 @@ load functions
 
     clean
 }
+
+@test "usage --format json and csv report the same usage" {
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py investor sam 10000
+    [ "$status" -eq 0 ]
+
+    run python tests/usage.py sam
+    [ "$status" -eq 0 ]
+
+    clean
+}
+
+@test "usage --all reports every proposal" {
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py usage --all
+    [ "$status" -eq 0 ]
+    [ $(echo $output | grep -c "sam") -eq 1 ]
+
+    run python crc_bank.py usage --all --sort pct --top 1 --format csv
+    [ "$status" -eq 0 ]
+    [ $(echo $output | grep -c "sam,smp") -eq 1 ]
+
+    # clean up database and JSON files
+    clean
+}
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+""" usage.py -- Check `crc_bank.py usage <account>` as JSON and CSV
+Usage:
+    usage.py <account>
+    usage.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Positional Arguments:
+    <account>               An account with a proposal
+
+Compares both formats with each other and with `get_sus`, exits with the
+first difference, run it from the directory you run crc_bank.py from
+"""
+
+from pathlib import Path
+import csv
+import json
+import subprocess
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+from constants import CLUSTERS
+
+
+def crc_bank(*args):
+    return subprocess.run(
+        [sys.executable, "crc_bank.py", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def check(found, expected, what):
+    if found != expected:
+        sys.exit(f"{what} is {found!r}, expected {expected!r}")
+
+
+def check_percent(found, used, available, what):
+    if available == 0:
+        check(found, None, what)
+    elif found is None or abs(found - 100.0 * used / available) > 0.01:
+        sys.exit(f"{what} is {found!r}, expected {100.0 * used / available}")
+
+
+def text(value):
+    # How the CSV writes a JSON value
+    return "" if value is None else str(value)
+
+
+args = docopt(__doc__)
+account = args["<account>"]
+
+# type,<clusters>; proposal,<sus>; investment,<sus> for each investment
+sus = [line.split(",") for line in crc_bank("get_sus", account).splitlines()[1:]]
+proposal = {c: int(s) for c, s in zip(CLUSTERS, sus[0][1:])}
+investments = sum([int(row[1]) for row in sus[1:]])
+
+usage = json.loads(crc_bank("usage", account, "--format", "json"))
+check(usage["account"], account, "account")
+check([c["cluster"] for c in usage["clusters"]], CLUSTERS, "clusters")
+check(usage["proposal_total"], sum(proposal.values()), "proposal_total")
+check(usage["investments"], investments, "investments")
+for cluster in usage["clusters"]:
+    name = cluster["cluster"]
+    check(cluster["available"], proposal[name], f"available SUs on {name}")
+    check_percent(
+        cluster["percent"], cluster["used"], cluster["available"], f"percent on {name}"
+    )
+    for user in cluster["users"]:
+        check_percent(
+            user["percent"],
+            user["used"],
+            cluster["available"],
+            f"percent of {user['user']} on {name}",
+        )
+used = sum([c["used"] for c in usage["clusters"]])
+check(usage["used"], used, "used")
+check_percent(usage["percent"], used, sum(proposal.values()) + investments, "percent")
+check_percent(
+    usage["percent_no_investments"],
+    used,
+    sum(proposal.values()),
+    "percent_no_investments",
+)
+
+# The CSV has one row per user, per cluster and for the account
+rows = list(csv.reader(crc_bank("usage", account, "--format", "csv").splitlines()))
+check(rows[0], ["account", "cluster", "user", "available", "used", "percent"], "header")
+expected = []
+for cluster in usage["clusters"]:
+    for user in cluster["users"]:
+        values = [cluster["available"], user["used"], user["percent"]]
+        expected.append([account, cluster["cluster"], user["user"]] + values)
+    values = [cluster["available"], cluster["used"], cluster["percent"]]
+    expected.append([account, cluster["cluster"], ""] + values)
+values = [usage["proposal_total"] + investments, usage["used"], usage["percent"]]
+expected.append([account, "", ""] + values)
+check(rows[1:], [[text(v) for v in row] for row in expected], "CSV")
+print(f"usage of {account} matches as JSON and CSV")
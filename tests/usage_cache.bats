@@ -0,0 +1,40 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "usage_cache expires and evicts entries" {
+    run python tests/usage_cache.py
+    [ "$status" -eq 0 ]
+}
+
+@test "lock, unlock and renewal invalidate the cached usage" {
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    # usage reads sshare once and caches the account
+    run python crc_bank.py usage sam
+    [ "$status" -eq 0 ]
+    [ "$(cached_accounts)" = "sam" ]
+
+    run python crc_bank.py lock sam
+    [ "$status" -eq 0 ]
+    [ "$(cached_accounts)" = "" ]
+
+    run python crc_bank.py usage sam
+    [ "$(cached_accounts)" = "sam" ]
+
+    run python crc_bank.py unlock sam
+    [ "$status" -eq 0 ]
+    [ "$(cached_accounts)" = "" ]
+
+    run python crc_bank.py usage sam
+    [ "$(cached_accounts)" = "sam" ]
+
+    # renewal reads the usage to archive it, then invalidates it
+    run python crc_bank.py renewal sam --smp=10000
+    [ "$status" -eq 0 ]
+    [ "$(cached_accounts)" = "" ]
+
+    # clean up database and JSON files
+    clean
+}
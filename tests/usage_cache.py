@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" usage_cache.py -- Check the expiry, eviction and threading of usage_cache
+Usage:
+    usage_cache.py
+    usage_cache.py -h | --help
+
+Options:
+    -h --help               Print this screen and exit
+
+Uses a cache in a temporary directory and a fake clock, exits with the first
+unexpected lookup
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docopt import docopt
+from constants import CLUSTERS
+import usage_cache
+
+clock = [0.0]
+
+
+def entries(account):
+    return {(account, c): [["", 3600], [account, 3600]] for c in CLUSTERS}
+
+
+def check(accounts, expected):
+    found = sorted({account for account, _ in usage_cache.load(accounts)})
+    if found != sorted(expected):
+        sys.exit(
+            f"At {clock[0]} the cache has {found} of {accounts}, expected {expected}"
+        )
+
+
+def count():
+    (n,) = usage_cache.connect().execute("SELECT COUNT(*) FROM usage_cache").fetchone()
+    return n
+
+
+args = docopt(__doc__)
+directory = TemporaryDirectory()
+usage_cache.usage_cache_path = str(Path(directory.name) / "usage_cache.db")
+usage_cache.usage_cache_ttl = 100
+usage_cache.usage_cache_max_entries = 3 * len(CLUSTERS)
+usage_cache.time = lambda: clock[0]
+
+# Entries come back as they were stored, only for accounts complete on
+# every cluster
+usage_cache.store(entries("a"))
+if usage_cache.load(["a"]) != entries("a"):
+    sys.exit(f"Loaded {usage_cache.load(['a'])}, expected {entries('a')}")
+usage_cache.store({("partial", CLUSTERS[0]): [["", 1]]})
+check(["a", "partial", "missing"], ["a"])
+
+# Entries older than the TTL are misses, and are dropped by the next store
+clock[0] = 100
+check(["a"], ["a"])
+clock[0] = 101
+check(["a"], [])
+usage_cache.store(entries("b"))
+if count() != len(CLUSTERS):
+    sys.exit(f"{count()} entries after the expired ones were dropped")
+
+# Over usage_cache_max_entries, the least recently loaded accounts go first
+clock[0] = 102
+usage_cache.store(entries("c"))
+clock[0] = 103
+usage_cache.store(entries("d"))
+clock[0] = 104
+check(["b"], ["b"])
+clock[0] = 105
+usage_cache.store(entries("e"))
+check(["b", "c", "d", "e"], ["b", "d", "e"])
+
+usage_cache.invalidate(["b", "d"])
+check(["b", "c", "d", "e"], ["e"])
+
+# `serve` stores from a background thread
+thread = Thread(target=usage_cache.store, args=(entries("f"),))
+thread.start()
+thread.join()
+check(["e", "f"], ["e", "f"])
+print("usage_cache expires, evicts and invalidates entries")
@@ -0,0 +1,22 @@
+#!/usr/bin/env bats
+
+load functions
+
+@test "verify_associations passes without proposals" {
+    run python crc_bank.py verify_associations
+    [ "$status" -eq 0 ]
+
+    clean
+}
+
+@test "verify_associations passes for a proposal with associations" {
+    # insert proposal should work
+    run python crc_bank.py insert proposal sam --smp=10000
+    [ "$status" -eq 0 ]
+
+    run python crc_bank.py verify_associations
+    [ "$status" -eq 0 ]
+    [ $(echo $output | grep -c "Associations missing") -eq 0 ]
+
+    clean
+}
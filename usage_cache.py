@@ -0,0 +1,126 @@
+import json
+import sqlite3
+import threading
+from time import time
+from constants import (
+    CLUSTERS,
+    usage_cache_path,
+    usage_cache_ttl,
+    usage_cache_max_entries,
+    db_busy_timeout,
+)
+
+
+# The cache is only an optimization, when it can't be opened or written
+# (e.g. missing permissions) every lookup is a miss and nothing is stored.
+# sqlite3 connections can't be shared between threads (`serve` refreshes the
+# usage in a background thread), each thread opens its own
+_local = threading.local()
+
+
+def connect():
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = sqlite3.connect(
+            usage_cache_path, timeout=db_busy_timeout, isolation_level=None
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage_cache (
+                account TEXT NOT NULL,
+                cluster TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (account, cluster)
+            )
+            """
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_usage_cache_accessed_at ON usage_cache (accessed_at)"
+        )
+        _local.connection = connection
+    return connection
+
+
+def placeholders(items):
+    return ",".join(["?"] * len(items))
+
+
+def load(accounts):
+    # Returns {(account, cluster): [(user, raw_usage), ...]} for the accounts
+    # with a fresh entry on every cluster, the account total has user ""
+    accounts = list(accounts)
+    if not accounts:
+        return {}
+    now = time()
+    try:
+        connection = connect()
+        rows = connection.execute(
+            f"SELECT account, cluster, usage FROM usage_cache WHERE fetched_at >= ? AND account IN ({placeholders(accounts)})",
+            [now - usage_cache_ttl] + accounts,
+        ).fetchall()
+    except sqlite3.Error:
+        return {}
+
+    entries = {
+        (account, cluster): json.loads(usage) for account, cluster, usage in rows
+    }
+    complete = [a for a in accounts if all([(a, c) in entries for c in CLUSTERS])]
+    if complete:
+        try:
+            connection.execute(
+                f"UPDATE usage_cache SET accessed_at = ? WHERE account IN ({placeholders(complete)})",
+                [now] + complete,
+            )
+        except sqlite3.Error:
+            pass
+    return {(a, c): entries[(a, c)] for a in complete for c in CLUSTERS}
+
+
+def store(entries):
+    # `entries` looks like the result of `load`
+    if not entries:
+        return
+    now = time()
+    rows = [
+        (account, cluster, json.dumps(usage), now, now)
+        for (account, cluster), usage in entries.items()
+    ]
+    try:
+        connection = connect()
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR REPLACE INTO usage_cache VALUES (?, ?, ?, ?, ?)", rows
+            )
+            evict(connection, now)
+    except sqlite3.Error:
+        pass
+
+
+def evict(connection, now):
+    # Drop expired entries, then the least recently used ones over the limit
+    connection.execute(
+        "DELETE FROM usage_cache WHERE fetched_at < ?", [now - usage_cache_ttl]
+    )
+    (count,) = connection.execute("SELECT COUNT(*) FROM usage_cache").fetchone()
+    if count > usage_cache_max_entries:
+        connection.execute(
+            "DELETE FROM usage_cache WHERE rowid IN (SELECT rowid FROM usage_cache ORDER BY accessed_at LIMIT ?)",
+            [count - usage_cache_max_entries],
+        )
+
+
+def invalidate(accounts):
+    accounts = list(accounts)
+    if not accounts:
+        return
+    try:
+        connect().execute(
+            f"DELETE FROM usage_cache WHERE account IN ({placeholders(accounts)})",
+            accounts,
+        )
+    except sqlite3.Error:
+        pass
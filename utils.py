@@ -1,32 +1,60 @@
-from subprocess import Popen, PIPE
+from subprocess import Popen, PIPE, TimeoutExpired
+from concurrent.futures import ThreadPoolExecutor
 from shlex import split
 from datetime import datetime, timedelta, date
 from enum import Enum
-from io import StringIO
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 import csv
 from math import floor
-from smtplib import SMTP
-from email.message import EmailMessage
-from bs4 import BeautifulSoup
+import json
+import usage_cache
 from constants import (
     CLUSTERS,
     proposal_table,
     investor_table,
+    investor_archive_table,
     date_format,
-    email_suffix,
-    notify_sus_limit_email_text,
-    three_month_proposal_expiry_notification_email,
-    proposal_expires_notification_email,
-    send_email_from,
-    super_cluster,
+    slurm_workers,
+    slurm_timeout,
+    sacctmgr_accounts_per_call,
+    notification_thresholds,
 )
-import datafreeze
-import json
 
 
-def run_command(cmd):
-    out, err = Popen(split(cmd), stdout=PIPE, stderr=PIPE).communicate()
-    return out.decode("utf-8"), err.decode("utf-8")
+def execute(cmd, timeout=slurm_timeout):
+    # (stdout, stderr, return code), the return code is None after a timeout
+    proc = Popen(split(cmd), stdout=PIPE, stderr=PIPE)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except TimeoutExpired:
+        proc.kill()
+        out, err = proc.communicate()
+        return out.decode("utf-8"), err.decode("utf-8"), None
+    return out.decode("utf-8"), err.decode("utf-8"), proc.returncode
+
+
+def run_command(cmd, timeout=slurm_timeout):
+    out, err, returncode = execute(cmd, timeout)
+    if returncode is None:
+        err += f"`{cmd}` timed out after {timeout} seconds"
+    return out, err
+
+
+def check_command(cmd, timeout=slurm_timeout):
+    # Right(stdout) when the command finished in time and succeeded
+    out, err, returncode = execute(cmd, timeout)
+    if returncode is None:
+        return Left(f"`{cmd}` timed out after {timeout} seconds")
+    if returncode != 0:
+        return Left(f"`{cmd}` failed with exit code {returncode}: {err.strip()}")
+    return Right(out)
+
+
+def check_commands(cmds, workers=slurm_workers, timeout=slurm_timeout):
+    # Run the commands concurrently, the results are in the same order as `cmds`
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda cmd: check_command(cmd, timeout), cmds))
 
 
 class Right:
@@ -78,14 +106,37 @@ def check_service_units_valid_clusters(args, greater_than_ten_thousand=True):
     return Right(result)
 
 
-def account_and_cluster_associations_exists(account):
-    missing = []
-    for cluster in CLUSTERS:
-        out, err = run_command(
-            f"sacctmgr -n show assoc account={account} cluster={cluster} format=account,cluster"
-        )
-        if out.strip() == "":
-            missing.append(cluster)
+class AssociationIndex:
+    # The (account, cluster) pairs with an association in Slurm
+    def __init__(self, pairs):
+        self.pairs = set(pairs)
+
+    def missing_clusters(self, account):
+        return [c for c in CLUSTERS if (account, c) not in self.pairs]
+
+
+def load_association_index(accounts=None):
+    # One sacctmgr call lists the associations of every account on every
+    # cluster, or only those of `accounts`
+    cmd = (
+        f"sacctmgr -n -P show assoc cluster={','.join(CLUSTERS)} format=account,cluster"
+    )
+    if accounts is not None:
+        cmd += f" account={','.join(accounts)}"
+    out, _ = run_command(cmd)
+
+    pairs = []
+    for line in out.split("\n"):
+        fields = line.strip().split("|")
+        if len(fields) >= 2 and fields[0]:
+            pairs.append((fields[0], fields[1]))
+    return AssociationIndex(pairs)
+
+
+def account_and_cluster_associations_exists(account, index=None):
+    if index is None:
+        index = load_association_index([account])
+    missing = index.missing_clusters(account)
     if missing:
         return Left(
             f"Associations missing for account `{account}` on clusters `{','.join(missing)}`"
@@ -101,74 +152,110 @@ def account_exists_in_table(table, account):
         return Left(f"Account `{account}` doesn't exist in the database")
 
 
+class AccountContext:
+    # The proposal and investments for one account, loaded once per command
+    # and passed to every function that needs them
+    def __init__(self, proposal, investments, investment_archives=None):
+        self.account = proposal["account"]
+        self.proposal = proposal
+        self.investments = investments
+        self._investment_archives = investment_archives
+
+    @property
+    def investment_archives(self):
+        # Only check_sus_limit needs these, load them on first use
+        if self._investment_archives is None:
+            self._investment_archives = list(
+                investor_archive_table.find(proposal_id=self.proposal["id"])
+            )
+        return self._investment_archives
+
+
+def load_account_context(account):
+    x = account_exists_in_table(proposal_table, account)
+    if isinstance(x, Left):
+        return x
+    return Right(AccountContext(x.value, list(investor_table.find(account=account))))
+
+
+def group_by(rows, key):
+    result = defaultdict(list)
+    for row in rows:
+        result[row[key]].append(row)
+    return result
+
+
+def get_slurm_accounts():
+    out, _ = run_command("sacctmgr list accounts -n -P format=account")
+    return [line.strip() for line in out.split("\n") if line.strip()]
+
+
 def log_action(s):
     with open("logs/crc_bank.log", "a+") as f:
         f.write(f"{datetime.now()}: {s}\n")
 
 
 def get_usage_for_account(account):
-    raw_usage = 0
-    for cluster in CLUSTERS:
-        out, _ = run_command(
-            f"sshare --noheader --account={account} --cluster={cluster} --format=RawUsage"
-        )
-        raw_usage += int(out.strip().split("\n")[1])
+    snapshot = get_usage_snapshot([account])
+    raw_usage = sum([snapshot.get(account, cluster) for cluster in CLUSTERS])
     return raw_usage / (60.0 * 60.0)
 
 
-def find_next_notification(usage):
-    members = list(PercentNotified)
+def check_notification_thresholds(thresholds):
+    if not thresholds or thresholds[-1] != 100:
+        raise ValueError("notification_thresholds in constants.py must end with 100")
+    if not all([isinstance(p, int) and 0 < p <= 100 for p in thresholds]):
+        raise ValueError(
+            "notification_thresholds in constants.py must be whole percentages between 1 and 100"
+        )
+    if any([a >= b for a, b in zip(thresholds, thresholds[1:])]):
+        raise ValueError("notification_thresholds in constants.py must be increasing")
+    return thresholds
 
-    exceeded = [usage > x.to_percentage() for x in members]
 
-    try:
-        index = exceeded.index(False)
-        result = PercentNotified.Zero if index == 0 else members[index - 1]
-    except ValueError:
-        result = PercentNotified.Hundred
+class NotificationLevel(Enum):
+    # The value is the percentage, which is stored as percent_notified
+    def succ(self):
+        position = notification_positions[self] + 1
+        return notification_levels[position % len(notification_levels)]
 
-    return result
+    def pred(self):
+        position = notification_positions[self] - 1
+        return notification_levels[position % len(notification_levels)]
 
+    def to_percentage(self):
+        return float(self.value)
+
+
+# Names for the default thresholds, other thresholds are named e.g. Percent95
+threshold_names = {
+    0: "Zero",
+    25: "TwentyFive",
+    50: "Fifty",
+    75: "SeventyFive",
+    90: "Ninety",
+    100: "Hundred",
+}
+notification_percentages = [0] + check_notification_thresholds(notification_thresholds)
+PercentNotified = NotificationLevel(
+    "PercentNotified",
+    [(threshold_names.get(p, f"Percent{p}"), p) for p in notification_percentages],
+)
+notification_levels = list(PercentNotified)
+notification_positions = {level: i for i, level in enumerate(notification_levels)}
 
-class PercentNotified(Enum):
-    Zero = 0
-    TwentyFive = 1
-    Fifty = 2
-    SeventyFive = 3
-    Ninety = 4
-    Hundred = 5
 
-    def succ(self):
-        cls = self.__class__
-        members = list(cls)
-        index = members.index(self) + 1
-        if index >= len(members):
-            return members[0]
-        else:
-            return members[index]
+def find_next_notification(usage):
+    # The highest level whose percentage the usage exceeds
+    index = bisect_left(notification_percentages, usage) - 1
+    return notification_levels[max(index, 0)]
 
-    def pred(self):
-        cls = self.__class__
-        members = list(cls)
-        index = members.index(self) - 1
-        if index < 0:
-            return members[5]
-        else:
-            return members[index]
 
-    def to_percentage(self):
-        if self == PercentNotified.Zero:
-            return 0.0
-        elif self == PercentNotified.TwentyFive:
-            return 25.0
-        elif self == PercentNotified.Fifty:
-            return 50.0
-        elif self == PercentNotified.SeventyFive:
-            return 75.0
-        elif self == PercentNotified.Ninety:
-            return 90.0
-        else:
-            return 100.0
+def stored_notification(percent_notified):
+    # The level of a stored percent_notified: the highest threshold at or
+    # below it, so proposals stay valid when thresholds are added or removed
+    index = bisect_right(notification_percentages, percent_notified) - 1
+    return notification_levels[max(index, 0)]
 
 
 class ProposalType(Enum):
@@ -202,145 +289,275 @@ def check_date_valid(d):
     return Right(date)
 
 
-def get_raw_usage_in_hours(account, cluster):
-    o, _ = run_command(f"sshare -A {account} -M {cluster} -P -a")
-    # Only the second and third line are necessary, wrapped in text buffer
-    sio = StringIO("\n".join(o.split("\n")[1:3]))
-
-    # use built-in CSV reader to read header and data
-    reader = csv.reader(sio, delimiter="|")
-    header = next(reader)
-    data = next(reader)
-
-    # Find the index of RawUsage from the header
-    raw_usage_idx = header.index("RawUsage")
-    return convert_to_hours(data[raw_usage_idx])
-
-
-def lock_account(account):
-    clusters = ",".join(CLUSTERS)
-    _, _ = run_command(
-        f"sacctmgr -i modify account where account={account} cluster={clusters} set GrpTresRunMins=cpu=0"
-    )
-
-
-def unlock_account(account):
-    clusters = ",".join(CLUSTERS)
-    _, _ = run_command(
-        f"sacctmgr -i modify account where account={account} cluster={clusters} set GrpTresRunMins=cpu=-1"
-    )
-
-
-def get_investment_status(account):
-    cluster_h = "Cluster"
-    total_investment_h = "Total Investment SUs"
-    start_date_h = "Start Date"
-    current_sus_h = "Current SUs"
-    withdrawn_h = "Withdrawn SUs"
-    rollover_h = "Rollover SUs"
+class UsageSnapshot:
+    def __init__(self, accounts=None):
+        # Accounts covered by the snapshot, None means every account
+        self.accounts = None if accounts is None else set(accounts)
+        # (account, cluster, user) -> RawUsage in seconds, the account total has user ""
+        self.raw_usage = {}
+        # (account, cluster) -> users in the order sshare reported them
+        self.users = defaultdict(list)
+
+    def covers(self, accounts):
+        if self.accounts is None:
+            return True
+        return accounts is not None and set(accounts) <= self.accounts
+
+    def add(self, account, cluster, user, raw_usage):
+        if user and (account, cluster, user) not in self.raw_usage:
+            self.users[(account, cluster)].append(user)
+        self.raw_usage[(account, cluster, user)] = raw_usage
+
+    def update(self, other):
+        if self.accounts is None or other.accounts is None:
+            self.accounts = None
+        else:
+            self.accounts |= other.accounts
+        for (account, cluster, user), raw_usage in other.raw_usage.items():
+            self.add(account, cluster, user, raw_usage)
+
+    def get(self, account, cluster, user=""):
+        return self.raw_usage.get((account, cluster, user), 0)
+
+    def get_users(self, account, cluster):
+        return self.users[(account, cluster)]
+
+    def remove(self, accounts):
+        for key in [k for k in self.raw_usage if k[0] in accounts]:
+            del self.raw_usage[key]
+        for key in [k for k in self.users if k[0] in accounts]:
+            del self.users[key]
+        if self.accounts is None:
+            self.accounts = {account for account, _, _ in self.raw_usage}
+        self.accounts -= set(accounts)
+
+    def entries(self):
+        # {(account, cluster): [(user, raw_usage), ...]}, the format of usage_cache
+        result = defaultdict(list)
+        for (account, cluster, user), raw_usage in self.raw_usage.items():
+            result[(account, cluster)].append((user, raw_usage))
+        return result
+
+
+def snapshot_from_entries(entries, accounts):
+    snapshot = UsageSnapshot(accounts)
+    for (account, cluster), usage in entries.items():
+        for user, raw_usage in usage:
+            snapshot.add(account, cluster, user, raw_usage)
+    return snapshot
+
+
+def parse_sshare(output, accounts=None):
+    snapshot = UsageSnapshot(accounts)
+    cluster = None
+    header = None
+    for line in output.split("\n"):
+        if line.strip() == "":
+            continue
+        # `sshare -M` prefixes each cluster with `CLUSTER: <name>`
+        if line.startswith("CLUSTER:"):
+            cluster = line.split(":", 1)[1].strip()
+            header = None
+            continue
+
+        data = next(csv.reader([line], delimiter="|"))
+        if header is None:
+            header = {h: idx for idx, h in enumerate(data)}
+            continue
+
+        # Accounts are indented to show the association tree
+        account = data[header["Account"]].strip()
+        user = data[header["User"]].strip()
+        raw_usage = data[header["RawUsage"]].strip()
+        snapshot.add(account, cluster, user, int(raw_usage) if raw_usage else 0)
+    return snapshot
+
+
+def load_usage_snapshot(accounts=None):
+    # One sshare per cluster, queried concurrently. A partial snapshot would
+    # read the missing usage as 0, so any failure is a Left
+    cmds = [f"sshare -a -P -M {cluster}" for cluster in CLUSTERS]
+    if accounts is not None:
+        cmds = [f"{cmd} -A {','.join(accounts)}" for cmd in cmds]
+    results = check_commands(cmds)
+    failed = [x.reason for x in results if isinstance(x, Left)]
+    if failed:
+        return Left(f"Unable to read the usage from sshare: {'; '.join(failed)}")
+    return Right(parse_sshare("\n".join([x.value for x in results]), accounts))
+
+
+_usage_snapshot = None
+
+
+def load_cached_usage_snapshot(accounts=None):
+    # Accounts with fresh entries in usage_cache skip sshare, `accounts=None`
+    # always reads every account from sshare
+    if accounts is None:
+        x = load_usage_snapshot()
+        if isinstance(x, Right):
+            usage_cache.store(x.value.entries())
+        return x
+
+    accounts = set(accounts)
+    entries = usage_cache.load(accounts)
+    snapshot = snapshot_from_entries(entries, {account for account, _ in entries})
+    missing = accounts - snapshot.accounts
+    if missing:
+        x = load_usage_snapshot(sorted(missing))
+        if isinstance(x, Left):
+            return x
+        usage_cache.store(x.value.entries())
+        snapshot.update(x.value)
+    return Right(snapshot)
+
+
+def fetch_usage_snapshot(accounts=None):
+    # One sshare call serves every (account, cluster, user) lookup in this
+    # process, `accounts=None` loads every account in one go
+    global _usage_snapshot
+    if _usage_snapshot is None:
+        x = load_cached_usage_snapshot(accounts)
+        if isinstance(x, Left):
+            return x
+        _usage_snapshot = x.value
+    elif not _usage_snapshot.covers(accounts):
+        if accounts is not None:
+            accounts = set(accounts) - _usage_snapshot.accounts
+        x = load_cached_usage_snapshot(accounts)
+        if isinstance(x, Left):
+            return x
+        _usage_snapshot.update(x.value)
+    return Right(_usage_snapshot)
+
+
+def get_usage_snapshot(accounts=None):
+    # Exits when sshare fails, see fetch_usage_snapshot
+    return unwrap_if_right(fetch_usage_snapshot(accounts))
+
+
+def refresh_usage_snapshot():
+    # Reload the usage of every account, for long running processes. Keeps
+    # the current snapshot and returns a Left when sshare fails
+    global _usage_snapshot
+    x = load_cached_usage_snapshot()
+    if isinstance(x, Right):
+        _usage_snapshot = x.value
+    return x
+
+
+def invalidate_usage(accounts):
+    # Usage read before a lock, unlock or renewal shouldn't be used after it
+    if _usage_snapshot is not None:
+        _usage_snapshot.remove(accounts)
+    usage_cache.invalidate(accounts)
 
-    cluster_w = 7
-    total_investment_w = 20
-    start_date_w = 10
-    current_sus_w = 11
-    withdrawn_w = 13
-    rollover_w = 12
 
-    result_s = f"{cluster_h} | {total_investment_h} | {start_date_h} | {current_sus_h} | {withdrawn_h} | {rollover_h}\n"
+def get_raw_usage_in_hours(account, cluster):
+    return convert_to_hours(get_usage_snapshot([account]).get(account, cluster))
 
-    for row in investor_table.find(account=account):
-        for cluster in CLUSTERS:
-            if row[cluster] != 0:
-                per_year = f"per_year_{cluster}"
-                current = f"current_{cluster}"
-                withdrawn = f"withdrawn_{cluster}"
-                rollover = f"rollover_{cluster}"
-                result_s += f"{cluster:7} | {row[cluster]:20} | {row['start_date'].strftime(date_format):>10} | {row[current]:11} | {row[withdrawn]:13} | {row[rollover]:12}\n"
 
-    return result_s
+# GrpTresRunMins of each (account, cluster) read from sacctmgr, kept up to
+# date by set_accounts_locked
+_grp_tres_run_mins = {}
 
 
-def notify_sus_limit(account):
-    proposal_row = proposal_table.find_one(account=account)
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
 
-    investment_s = get_investment_status(account)
 
-    email_html = notify_sus_limit_email_text.format(
-        PercentNotified(proposal_row["percent_notified"]).to_percentage(),
-        proposal_row["start_date"].strftime(date_format),
-        usage_string(account),
-        investment_s,
+def load_grp_tres_run_mins(accounts):
+    # One sacctmgr call per `sacctmgr_accounts_per_call` accounts not read yet,
+    # the account level association is the one without a user
+    clusters = ",".join(CLUSTERS)
+    missing = sorted(
+        set([a for a in accounts if (a, CLUSTERS[0]) not in _grp_tres_run_mins])
     )
+    for chunk in chunks(missing, sacctmgr_accounts_per_call):
+        for account in chunk:
+            for cluster in CLUSTERS:
+                _grp_tres_run_mins[(account, cluster)] = ""
+        out, _ = run_command(
+            f"sacctmgr -n -P show assoc account={','.join(chunk)} cluster={clusters} format=account,cluster,user,grptresrunmins"
+        )
+        for line in out.split("\n"):
+            fields = line.strip().split("|")
+            if len(fields) >= 4 and fields[0] in chunk and fields[2] == "":
+                _grp_tres_run_mins[(fields[0], fields[1])] = fields[3]
 
-    send_email(email_html, account)
-
-
-def get_account_email(account):
-    o, _ = run_command(f"sacctmgr show account {account} -P format=description -n")
-
-    return f"{o.strip()}{email_suffix}"
 
+def is_locked(account, cluster):
+    return "cpu=0" in _grp_tres_run_mins[(account, cluster)].split(",")
 
-def send_email(email_html, account):
-    # Extract the text from the email
-    soup = BeautifulSoup(email_html, "html.parser")
-    email_text = soup.get_text()
 
-    msg = EmailMessage()
-    msg.set_content(email_text)
-    msg.add_alternative(email_html, subtype="html")
-    msg["Subject"] = f"Your allocation on {super_cluster} for account: {account}"
-    msg["From"] = send_email_from
-    msg["To"] = get_account_email(account)
+def set_accounts_locked(accounts, locked):
+    # Lock (or unlock) the accounts on every cluster, skipping the ones
+    # already in that state, with as few sacctmgr calls as the command allows
+    load_grp_tres_run_mins(accounts)
+    if locked:
+        to_change = [
+            a for a in accounts if not all([is_locked(a, c) for c in CLUSTERS])
+        ]
+        value = "cpu=0"
+    else:
+        to_change = [a for a in accounts if any([is_locked(a, c) for c in CLUSTERS])]
+        value = "cpu=-1"
+    to_change = sorted(set(to_change))
+
+    # Returns the accounts sacctmgr changed and the reason each failed call
+    # didn't, the accounts of a failed call keep their cached state
+    changed = []
+    errors = []
+    clusters = ",".join(CLUSTERS)
+    for chunk in chunks(to_change, sacctmgr_accounts_per_call):
+        x = check_command(
+            f"sacctmgr -i modify account where account={','.join(chunk)} cluster={clusters} set GrpTresRunMins={value}"
+        )
+        if isinstance(x, Left):
+            errors.append(x.reason)
+            continue
+        for account in chunk:
+            for cluster in CLUSTERS:
+                _grp_tres_run_mins[(account, cluster)] = "cpu=0" if locked else ""
+        changed += chunk
 
-    with SMTP("localhost") as s:
-        s.send_message(msg)
+    invalidate_usage(changed)
+    return changed, errors
 
 
-def three_month_proposal_expiry_notification(account):
-    proposal_row = proposal_table.find_one(account=account)
+def lock_accounts(accounts):
+    return set_accounts_locked(accounts, True)
 
-    email_html = three_month_proposal_expiry_notification_email.format(
-        account,
-        proposal_row["end_date"].strftime(date_format),
-        proposal_row["start_date"].strftime(date_format),
-    )
 
-    send_email(email_html, account)
+def unlock_accounts(accounts):
+    return set_accounts_locked(accounts, False)
 
 
-def proposal_expires_notification(account):
-    proposal_row = proposal_table.find_one(account=account)
+def lock_account(account):
+    lock_accounts([account])
 
-    email_html = proposal_expires_notification_email.format(
-        account,
-        proposal_row["end_date"].strftime(date_format),
-        proposal_row["start_date"].strftime(date_format),
-    )
 
-    send_email(email_html, account)
+def unlock_account(account):
+    unlock_accounts([account])
 
 
-def get_available_investor_sus(account):
+def get_available_investor_sus(ctx):
     res = []
-    ods = investor_table.find(account=account)
-    for od in ods:
+    for od in ctx.investments:
         res.append(od["service_units"] - od[f"withdrawn_sus"])
     return res
 
 
-def get_current_investor_sus(account):
+def get_current_investor_sus(ctx):
     res = []
-    ods = investor_table.find(account=account)
-    for od in ods:
+    for od in ctx.investments:
         res.append(od[f"current_sus"] + od[f"rollover_sus"])
     return res
 
 
-def get_current_investor_sus_no_rollover(account):
+def get_current_investor_sus_no_rollover(ctx):
     res = []
-    ods = investor_table.find(account=account)
-    for od in ods:
+    for od in ctx.investments:
         res.append(od[f"current_sus"])
     return res
 
@@ -349,128 +566,48 @@ def convert_to_hours(usage):
     return floor(int(usage) / (60.0 * 60.0))
 
 
-def get_account_usage(account, cluster, avail_sus, output):
-    o, _ = run_command(f"sshare -A {account} -M {cluster} -P -a")
-    # Second line onward, required
-    sio = StringIO("\n".join(o.split("\n")[1:]))
-
-    # use built-in CSV reader to read header and data
-    reader = csv.reader(sio, delimiter="|")
-    header = next(reader)
-    raw_usage_idx = header.index("RawUsage")
-    user_idx = header.index("User")
-    for idx, data in enumerate(reader):
-        if idx != 0:
-            user = data[user_idx]
-            usage = convert_to_hours(data[raw_usage_idx])
-            if avail_sus == 0:
-                output.write(f"|{user:^20}|{usage:^30}|{'N/A':^30}|\n")
-            else:
-                output.write(
-                    f"|{user:^20}|{usage:^30}|{100.0 * usage / avail_sus:^30.2f}|\n"
-                )
-        else:
-            total_cluster_usage = convert_to_hours(data[raw_usage_idx])
+def projected_exhaustion_string(ctx):
+    # forecast imports this module, import it when needed
+    import forecast
 
-    return total_cluster_usage
+    return forecast.exhaustion_string(
+        forecast.projected_exhaustion(ctx), ctx.proposal["end_date"]
+    )
 
 
-def freeze_if_not_empty(items, path):
-    force_eval = list(items)
-    if force_eval:
-        datafreeze.freeze(force_eval, format="json", filename=path)
-    else:
-        with open(path, "w") as f:
-            f.write("{}\n")
-
-
-def usage_string(account):
-    proposal = proposal_table.find_one(account=account)
-    investments = sum(get_current_investor_sus(account))
-    proposal_total = sum([proposal[c] for c in CLUSTERS])
-    aggregate_usage = 0
-    with StringIO() as output:
-        for cluster in CLUSTERS:
-            output.write(f"|{'-' * 82}|\n")
-            output.write(
-                f"|{'Cluster: ' + cluster + ', Available SUs: ' + str(proposal[cluster]):^82}|\n"
-            )
-            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
-            output.write(
-                f"|{'User':^20}|{'SUs Used':^30}|{'Percentage of Total':^30}|\n"
-            )
-            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
-            total_usage = get_account_usage(account, cluster, proposal[cluster], output)
-            aggregate_usage += total_usage
-            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
-            if proposal[cluster] == 0:
-                output.write(f"|{'Overall':^20}|{total_usage:^30d}|{'N/A':^30}|\n")
-            else:
-                output.write(
-                    f"|{'Overall':^20}|{total_usage:^30d}|{100 * total_usage / proposal[cluster]:^30.2f}|\n"
-                )
-            output.write(f"|{'-' * 20}|{'-' * 30}|{'-' * 30}|\n")
-        output.write(f"|{'Aggregate':^82}|\n")
-        output.write(f"|{'-' * 40:^40}|{'-' * 41:^41}|\n")
-        if investments > 0:
-            investments_total = f"{investments:d}^a"
-            output.write(f"|{'Investments Total':^40}|{investments_total:^41}|\n")
-            output.write(
-                f"|{'Aggregate Usage (no investments)':^40}|{100 * aggregate_usage / proposal_total:^41.2f}|\n"
-            )
-            output.write(
-                f"|{'Aggregate Usage':^40}|{100 * aggregate_usage / (proposal_total + investments):^41.2f}|\n"
-            )
-        else:
-            output.write(
-                f"|{'Aggregate Usage':^40}|{100 * aggregate_usage / proposal_total:^41.2f}|\n"
-            )
-        if investments > 0:
-            output.write(f"|{'-' * 40:^40}|{'-' * 41:^41}|\n")
-            output.write(
-                f"|{'^a Investment SUs can be used across any cluster':^82}|\n"
-            )
-        output.write(f"|{'-' * 82}|\n")
-        return output.getvalue().strip()
+def info_string(ctx):
+    # Get entire rows, convert to human readable columns
+    od = dict(ctx.proposal)
+    od["proposal_type"] = ProposalType(od["proposal_type"]).name
+    od["percent_notified"] = stored_notification(od["percent_notified"]).name
+    od["start_date"] = od["start_date"].strftime(date_format)
+    od["end_date"] = od["end_date"].strftime(date_format)
 
+    lines = ["Proposal", "--------", json.dumps(od, indent=2), ""]
+    lines += [f"Projected exhaustion: {projected_exhaustion_string(ctx)}", ""]
 
-def years_left(end):
-    return end.year - date.today().year
+    for od in ctx.investments:
+        od = dict(od)
+        od["proposal_type"] = ProposalType(od["proposal_type"]).name
+        od["start_date"] = od["start_date"].strftime(date_format)
+        od["end_date"] = od["end_date"].strftime(date_format)
 
+        lines += [f"Investment: {od['id']:3}", "---------------"]
+        lines += [json.dumps(od, indent=2), ""]
 
-def ask_destructive(args):
-    if args["--yes"]:
-        choice = "yes"
-    else:
-        print(
-            "DANGER: This function OVERWRITES crc_bank.db, are you sure you want to do this? [y/N]"
-        )
-        choice = input().lower()
-    return choice
+    return "\n".join(lines)
 
 
-def import_from_json(args, table, table_type):
-    choice = ask_destructive(args)
-    if choice == "yes" or choice == "y":
-        if table_type == ProposalType.Proposal:
-            filename = "<proposal.json>"
-        elif table_type == ProposalType.Investor:
-            filename = "<investor.json>"
-        else:
-            raise ValueError
-        with open(args[filename], "r") as fp:
-            contents = json.load(fp)
-            table.drop()
-            if "results" in contents.keys():
-                for item in contents["results"]:
-                    start_date_split = [int(x) for x in item["start_date"].split("-")]
-                    item["start_date"] = date(
-                        start_date_split[0], start_date_split[1], start_date_split[2]
-                    )
-                    end_date_split = [int(x) for x in item["end_date"].split("-")]
-                    item["end_date"] = date(
-                        end_date_split[0], end_date_split[1], end_date_split[2]
-                    )
-                    del item["id"]
-
-                table.insert_many(contents["results"])
+def get_sus_string(ctx):
+    lines = [f"type,{','.join(CLUSTERS)}"]
+    sus = [str(ctx.proposal[c]) for c in CLUSTERS]
+    lines.append(f"proposal,{','.join(sus)}")
+
+    for row in get_current_investor_sus(ctx):
+        lines.append(f"investment,{row}")
+
+    return "\n".join(lines)
+
+
+def years_left(end):
+    return end.year - date.today().year